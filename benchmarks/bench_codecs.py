@@ -0,0 +1,66 @@
+"""
+Encode/decode time and size of each codec on realistic memories.
+
+Usage: python -m benchmarks.bench_codecs [rounds]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils.codec_utils import CODECS, encode, decode
+
+QUEUE_NAMES = ['tribune', 'elder', 'priest', 'sage', 'master', 'praetorian', 'border', 'cavalry']
+
+
+def create_title_queues(entries_per_queue: int = 500) -> dict:
+    start = datetime(2025, 2, 21, tzinfo=timezone.utc)
+    return {
+        name: {
+            "entries": [{"user_id": str(100000000000000000 + i),
+                         "user_name": f"alias{i}",
+                         "time": (start + timedelta(hours=i)).isoformat()} for i in range(entries_per_queue)],
+            "cursor": entries_per_queue // 2
+        } for name in QUEUE_NAMES
+    }
+
+
+def create_interactions(users: int = 500) -> dict:
+    return {
+        str(100000000000000000 + i): {
+            "history": [{"question": f"when is my sage slot {n}?",
+                         "response": "Your sage slot is tomorrow at 3PM UTC, good luck with the research! " * 3}
+                        for n in range(10)]
+        } for i in range(users)
+    }
+
+
+def create_preferences(users: int = 1000) -> dict:
+    return {
+        str(100000000000000000 + i): {"name": f"member{i}", "alias": f"alias{i}", "timezone": "Asia/Singapore"}
+        for i in range(users)
+    }
+
+
+def bench(name: str, data: dict, rounds: int):
+    print(name)
+    for codec in CODECS:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            payload = encode(data, codec)
+        encode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            decoded = decode(payload)
+        decode_ms = (time.perf_counter() - start) * 1000 / rounds
+
+        assert decoded == data
+        print(f'{codec:>12}: encode {encode_ms:7.2f} ms | decode {decode_ms:7.2f} ms | {len(payload) / 1024:8.1f} KB')
+
+
+if __name__ == '__main__':
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    bench('title_queues (8 x 500 entries)', create_title_queues(), rounds)
+    bench('interactions (500 users x 10)', create_interactions(), rounds)
+    bench('preferences (1000 users)', create_preferences(), rounds)
@@ -0,0 +1,68 @@
+"""
+Event loop lag while saving a large memory.
+
+Compares the old blocking write (serialize + write on the event loop) with
+SnapshotStore, which serializes on the loop and writes on the I/O executor.
+
+Usage: python -m benchmarks.bench_event_loop_lag [users] [saves]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from core.hippocampus import SnapshotStore, write_data_to_path
+
+
+def create_interactions(users: int) -> dict:
+    return {
+        str(100000000000000000 + i): {
+            "history": [{"question": f"when is my sage slot {n}?", "response": "Tomorrow at 3PM UTC. " * 10}
+                        for n in range(10)]
+        } for i in range(users)
+    }
+
+
+async def measure_lag(save, saves: int) -> tuple[float, float]:
+    """Returns (max lag, total time) in ms while running saves back to back"""
+    lags = []
+    running = True
+
+    async def heartbeat():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start - 0.001) * 1000)
+
+    ticker = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    for _ in range(saves):
+        await save()
+        await asyncio.sleep(0)
+    elapsed = (time.perf_counter() - start) * 1000
+    running = False
+    await ticker
+    return max(lags), elapsed
+
+
+async def main(users: int, saves: int):
+    data = create_interactions(users)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = f'{tmp_dir}/interactions.json'
+        store = SnapshotStore(path)
+
+        async def blocking_save():
+            write_data_to_path(data, path)
+
+        async def executor_save():
+            await store.persist(data)
+
+        for name, save in (("blocking", blocking_save), ("executor", executor_save)):
+            max_lag, elapsed = await measure_lag(save, saves)
+            print(f'{name:>10}: {saves} saves of {users} users in {elapsed:8.1f} ms, max loop lag {max_lag:6.1f} ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 20))
@@ -0,0 +1,65 @@
+"""
+Storage backends at 10k users.
+
+Runs the same workload against each WOLFIE_STORAGE backend through BasalGanglia:
+cold start + first lookup, single-user updates (update + save), and get_all.
+
+Usage: python -m benchmarks.bench_storage [users] [updates]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from core.ganglia import BasalGanglia, Memory
+from core.hippocampus import STORES, write_data_to_path
+
+
+def create_preferences(users: int) -> dict:
+    return {
+        str(100000000000000000 + i): {"name": f"member{i}", "alias": f"alias{i}", "timezone": "Asia/Singapore"}
+        for i in range(users)
+    }
+
+
+async def bench(storage: str, data: dict, updates: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = f'{tmp_dir}/user_preferences.json'
+        write_data_to_path(data, path)
+        await BasalGanglia(path, storage, shards=Memory.PREFERENCES.shards).load()  # migrate once, not part of the cold start
+        user_ids = list(data.keys())
+
+        start = time.perf_counter()
+        ganglia = BasalGanglia(path, storage, shards=Memory.PREFERENCES.shards)
+        await ganglia.get(user_ids[len(user_ids) // 2])
+        cold_start = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for i in range(updates):
+            user_id = user_ids[i * 7 % len(user_ids)]
+            prefs = dict(await ganglia.get(user_id))
+            prefs["timezone"] = "UTC"
+            await ganglia.update(user_id, prefs)
+            await ganglia.save()
+        update_ms = (time.perf_counter() - start) * 1000 / updates
+
+        start = time.perf_counter()
+        everything = await ganglia.get_all()
+        get_all_ms = (time.perf_counter() - start) * 1000
+        assert len(everything) == len(data)
+
+        print(f'{storage:>10}: cold start + get {cold_start:8.2f} ms | '
+              f'update + save {update_ms:7.3f} ms | get_all {get_all_ms:7.2f} ms')
+
+
+async def main(users: int, updates: int):
+    data = create_preferences(users)
+    print(f'{users} users, {updates} updates')
+    for storage in STORES:
+        await bench(storage, data, updates)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 200))
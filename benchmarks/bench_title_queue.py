@@ -0,0 +1,77 @@
+"""
+Title queue hot paths on one large queue: build, sort, conflict check and next free slot.
+"before" works on the stored dicts the way TitleQueue did, re-parsing the ISO times,
+"after" on the QueueModel with pre-parsed entries and the slot index.
+
+Usage: python -m benchmarks.bench_title_queue [entries] [rounds]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser
+
+from cogs.queue.model import QueueModel, to_epoch
+from cogs.queue.slot_index import to_epoch_hour
+from utils.datetime_utils import read_iso_datetime
+
+
+def create_queue(entries: int) -> dict:
+    start = datetime(2025, 2, 21, tzinfo=timezone.utc)
+    # every 7th hour is free, so the slot search has gaps to find
+    hours = [hour for hour in range(entries + entries // 6 + 1) if hour % 7 != 3][:entries]
+    return {
+        "entries": [{"user_id": str(100000000000000000 + i % 500),
+                     "user_name": f"alias{i % 500}",
+                     "time": (start + timedelta(hours=hour)).isoformat()} for i, hour in enumerate(reversed(hours))],
+        "cursor": entries // 2
+    }
+
+
+def before(queue: dict, probes: list):
+    entries = [dict(entry) for entry in queue["entries"]]
+    entries.sort(key=lambda e: parser.isoparse(e["time"]))
+    for user_id, dt in probes:
+        any(e["user_id"] == user_id and abs(dt - datetime.fromisoformat(e["time"])) < timedelta(days=1)
+            for e in entries)
+        any(read_iso_datetime(e["time"]) == dt for e in entries)
+
+    # next free slot after the cursor, as find_next_available_slot did
+    dt = read_iso_datetime(entries[queue["cursor"]]["time"])
+    for _ in range(72):
+        dt = dt + timedelta(hours=1)
+        if all(read_iso_datetime(entry["time"]) != dt for entry in entries):
+            return dt
+
+
+def after(queue: dict, probes: list):
+    model = QueueModel.from_dict(queue)
+    for user_id, dt in probes:
+        model.has_entry_within(user_id, to_epoch(dt))
+        to_epoch_hour(dt) in model.slots
+
+    return model.slots.next_free(model.current.hour, 72)
+
+
+def bench(name: str, func, queue: dict, probes: list, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(queue, probes)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / rounds
+    print(f'{name:>7}: {elapsed_ms:9.2f} ms')
+    return elapsed_ms
+
+
+if __name__ == '__main__':
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    queue = create_queue(entries)
+    probes = [(str(100000000000000000 + i), datetime(2025, 3, 1, i, tzinfo=timezone.utc)) for i in range(10)]
+    assert to_epoch_hour(before(queue, probes)) == after(queue, probes)
+
+    print(f'{entries} entries, 10 conflict checks + next free slot')
+    before_ms = bench('before', before, queue, probes, rounds)
+    after_ms = bench('after', after, queue, probes, rounds)
+    print(f'{before_ms / after_ms:.1f}x faster')
@@ -1,4 +1,6 @@
+import asyncio
 import os
+import signal
 import traceback
 
 import discord
@@ -24,7 +26,16 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = Bot(command_prefix=PREFIX, intents=intents)
+class Wolfie(Bot):
+    async def setup_hook(self):
+        # nohup + kill sends SIGTERM, close gracefully so pending memory is flushed
+        self.loop.add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+
+    async def close(self):
+        await self.cortex.shutdown()
+        await super().close()
+
+bot = Wolfie(command_prefix=PREFIX, intents=intents)
 bot.cortex = Cortex()
 bot.brain = Brain()
 
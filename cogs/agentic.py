@@ -25,10 +25,11 @@ class Wolfai(commands.Cog):
         """
         logger.info(f"ask: {question}")
 
+        cortex = self.cortex.for_guild(ctx.guild)
         user_id = str(ctx.author.id)
-        user_interactions: dict = await self.cortex.get_memory(self.memory, user_id)
-        user_details = (await self.cortex.get_user_details(user_id)).get("preferences", {})
-        shared_events = await self.cortex.get_memory(Memory.SHARED_EVENTS)
+        user_interactions: dict = await cortex.get_memory(self.memory, user_id)
+        user_details = (await cortex.get_user_details(user_id)).get("preferences", {})
+        shared_events = await cortex.get_shared_events()
 
         interaction_history = user_interactions.get("history", [])
         response = self.brain.ask(user_details, shared_events, interaction_history, question)
@@ -44,8 +45,8 @@ class Wolfai(commands.Cog):
             "history": interaction_history[-10:] if len(interaction_history) > 10 else interaction_history
         })
 
-        await self.cortex.update_memory(Memory.INTERACTIONS, user_id, user_interactions)
-        await self.cortex.remember(self.memory)
+        await cortex.update_memory(Memory.INTERACTIONS, user_id, user_interactions)
+        await cortex.remember(self.memory)
         await ctx.send(f"{response}")
 
 
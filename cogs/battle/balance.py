@@ -0,0 +1,195 @@
+"""
+Roster balancing of a battle, solved as a min cost flow.
+
+Every registrant plays the slot of their primary registration, the other registrations are the slots
+they can be moved to. Registrants are placed so that each slot stays within its capacity and close to
+its role targets, moving as few of them away from their primary slot as possible:
+
+    source -> registrant group -> (slot, role) -> slot -> sink
+
+Registrants with the same registrations are interchangeable and share one group node, so the network
+has a few dozen nodes for a few hundred registrants. Costs per registrant:
+    0               placed in the primary slot
+    MOVE_COST       placed in another registered slot
+    OVER_COST       each registrant of a role beyond the slot's target
+    UNPLACED_COST   not placed, only when every registered slot is full
+"""
+
+from collections import deque
+
+MOVE_COST = 1
+OVER_COST = 2
+UNPLACED_COST = 100
+
+INFINITY = float('inf')
+
+
+class FlowNetwork:
+    """A flow network solved for the min cost max flow by successive shortest paths"""
+
+    def __init__(self):
+        # edge e runs from the head of e ^ 1 to _to[e], e ^ 1 is its reverse edge
+        self._to: list[int] = []
+        self._cap: list[int] = []
+        self._cost: list[int] = []
+        self._edges: list[list[int]] = []
+
+    def add_node(self) -> int:
+        self._edges.append([])
+        return len(self._edges) - 1
+
+    def add_edge(self, tail: int, head: int, capacity: int, cost: int) -> int:
+        """Adds an edge and returns its id, see flow"""
+        edge = len(self._to)
+        for node, to, cap, cost in ((tail, head, capacity, cost), (head, tail, 0, -cost)):
+            self._edges[node].append(len(self._to))
+            self._to.append(to)
+            self._cap.append(cap)
+            self._cost.append(cost)
+        return edge
+
+    def flow(self, edge: int) -> int:
+        """Flow through an edge, the capacity left on its reverse"""
+        return self._cap[edge ^ 1]
+
+    def solve(self, source: int, sink: int) -> tuple[int, int]:
+        """
+        Sends the max flow from source to sink at the least cost, augmenting the bottleneck of the
+        cheapest path (SPFA, residual costs can be negative) until there is none. Returns (flow, cost)
+        """
+        total_flow = total_cost = 0
+        nodes = len(self._edges)
+        while True:
+            dist = [INFINITY] * nodes
+            via = [-1] * nodes
+            queued = [False] * nodes
+            dist[source] = 0
+            queue = deque([source])
+            while queue:
+                node = queue.popleft()
+                queued[node] = False
+                for edge in self._edges[node]:
+                    to = self._to[edge]
+                    if self._cap[edge] > 0 and dist[node] + self._cost[edge] < dist[to]:
+                        dist[to] = dist[node] + self._cost[edge]
+                        via[to] = edge
+                        if not queued[to]:
+                            queued[to] = True
+                            queue.append(to)
+
+            if dist[sink] == INFINITY:
+                return total_flow, total_cost
+
+            bottleneck, node = INFINITY, sink
+            while node != source:
+                bottleneck = min(bottleneck, self._cap[via[node]])
+                node = self._to[via[node] ^ 1]
+            node = sink
+            while node != source:
+                self._cap[via[node]] -= bottleneck
+                self._cap[via[node] ^ 1] += bottleneck
+                node = self._to[via[node] ^ 1]
+            total_flow += bottleneck
+            total_cost += bottleneck * dist[sink]
+
+
+class Balance:
+    """
+    A proposed placement of every registrant, user_id -> (day, time) or None if not placed.
+    moves are (user_id, from slot or None, to slot or None) of the registrants whose primary slot changes
+    """
+
+    __slots__ = ('placement', 'moves', 'version')
+
+    def __init__(self, placement: dict, moves: list, version: int = None):
+        self.placement = placement
+        self.moves = moves
+        self.version = version
+
+    def composition(self, teams: dict, role_key: str = 'role') -> dict[tuple, dict[str, int]]:
+        """(day, time) -> role -> number of registrants placed there"""
+        counts = {}
+        for user_id, slot in self.placement.items():
+            if slot is not None:
+                role = teams[slot[0]][slot[1]][user_id].get('context', {}).get(role_key, 'Unknown')
+                roles = counts.setdefault(slot, {})
+                roles[role] = roles.get(role, 0) + 1
+        return counts
+
+
+def primary_placement(teams: dict) -> dict:
+    """user_id -> the (day, time) of their primary registration, None if they have none"""
+    placement = {}
+    for day, day_slots in teams.items():
+        for time, members in day_slots.items():
+            for user_id, entry in members.items():
+                if entry.get('context', {}).get('primary', False) and placement.get(user_id) is None:
+                    placement[user_id] = (day, time)
+                else:
+                    placement.setdefault(user_id, None)
+    return placement
+
+
+def balance(teams: dict, capacities: dict[str, int], targets: dict[str, int], role_key: str = 'role') -> Balance:
+    """
+    Places every registrant of teams, day -> time -> user_id -> entry, in one of their registered slots.
+    capacities are per time key, targets per role; a role without a target has no limit besides the capacity
+    """
+    current = primary_placement(teams)
+
+    # registrants with the same registrations and primary slot are interchangeable
+    options: dict[str, list] = {}
+    for day, day_slots in teams.items():
+        for time, members in day_slots.items():
+            if time not in capacities:
+                continue
+            for user_id, entry in members.items():
+                role = entry.get('context', {}).get(role_key, 'Unknown')
+                options.setdefault(user_id, []).append(((day, time), role))
+    groups: dict[tuple, list[str]] = {}
+    for user_id in sorted(options):
+        groups.setdefault((current[user_id], tuple(sorted(options[user_id]))), []).append(user_id)
+
+    network = FlowNetwork()
+    source, sink = network.add_node(), network.add_node()
+    slot_nodes: dict[tuple, int] = {}
+    role_nodes: dict[tuple, int] = {}
+
+    def role_node(slot: tuple, role: str) -> int:
+        node = role_nodes.get((slot, role))
+        if node is None:
+            if slot not in slot_nodes:
+                slot_nodes[slot] = network.add_node()
+                network.add_edge(slot_nodes[slot], sink, capacities[slot[1]], 0)
+            node = role_nodes[(slot, role)] = network.add_node()
+            target = targets.get(role)
+            if target is None:
+                network.add_edge(node, slot_nodes[slot], capacities[slot[1]], 0)
+            else:
+                network.add_edge(node, slot_nodes[slot], target, 0)
+                network.add_edge(node, slot_nodes[slot], capacities[slot[1]], OVER_COST)
+        return node
+
+    group_edges = []
+    for (primary, slots), user_ids in groups.items():
+        node = network.add_node()
+        network.add_edge(source, node, len(user_ids), 0)
+        network.add_edge(node, sink, len(user_ids), UNPLACED_COST)
+        edges = [(slot, network.add_edge(node, role_node(slot, role), len(user_ids),
+                                         0 if slot == primary else MOVE_COST))
+                 for slot, role in slots]
+        group_edges.append((primary, user_ids, edges))
+    network.solve(source, sink)
+
+    # hand out the slots of each group, the registrants of a group keep their primary slot first
+    placement, moves = {}, []
+    for primary, user_ids, edges in group_edges:
+        slots = [slot for slot, edge in sorted(edges, key=lambda e: e[0] != primary)
+                 for _ in range(network.flow(edge))]
+        for i, user_id in enumerate(user_ids):
+            slot = slots[i] if i < len(slots) else None
+            placement[user_id] = slot
+            if slot != primary:
+                moves.append((user_id, primary, slot))
+    moves.sort(key=lambda move: (move[1] or ('',), move[0]))
+    return Balance(placement, moves)
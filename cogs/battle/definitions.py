@@ -0,0 +1,127 @@
+"""
+Battle types, defined in the battles config (WOLFIE_BATTLES_CONFIG, config/battles.json by default).
+
+Each battle is keyed by its memory type:
+    title       shown on listings
+    days        day key -> weekday, e.g. {"d1": "saturday", "d2": "sunday"}, the first day starts the battle week
+    slots       time key -> UTC start "HH:MM", or {"time": "HH:MM", "capacity": n} to override the capacity
+    capacity    members per slot
+    context     registration field -> type (str, bool, int)
+    targets     role -> members of that role wanted per slot, used to balance the rosters (optional)
+    rollover    weekday the past week is moved to the battle history, monday by default
+
+Definitions are compiled once into lookup tables, parsing a slot or a listing filter is a dict lookup.
+The config shapes a battle, its memory is still declared in core.ganglia (Memory member, Ganglia class, schema)
+and its commands in a cog.
+"""
+
+import json
+import os
+from datetime import date, time, timedelta
+from functools import lru_cache
+
+BATTLES_CONFIG = os.getenv('WOLFIE_BATTLES_CONFIG', 'config/battles.json')
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+CONTEXT_TYPES = {'str': str, 'bool': bool, 'int': int}
+
+
+class BattleDefinition:
+    """A battle type of the battles config, compiled into lookup tables"""
+
+    def __init__(self, name: str, config: dict):
+        self.name = name
+        self.title: str = config['title']
+        self.capacity: int = int(config.get('capacity', 30))
+
+        # day key -> weekday (0 is monday), in the order of the config
+        self.days: dict[str, int] = {day: WEEKDAYS.index(weekday.lower()) for day, weekday in config['days'].items()}
+        self.first_weekday = next(iter(self.days.values()))
+
+        # time key -> UTC start, and its capacity
+        self.slots: dict[str, time] = {}
+        self.capacities: dict[str, int] = {}
+        for key, slot in config['slots'].items():
+            slot = slot if isinstance(slot, dict) else {'time': slot}
+            self.slots[key] = time.fromisoformat(slot['time'])
+            self.capacities[key] = int(slot.get('capacity', self.capacity))
+
+        self.context: dict[str, type] = {field: CONTEXT_TYPES[kind] for field, kind in config.get('context', {}).items()}
+        self.targets: dict[str, int] = {role: int(count) for role, count in config.get('targets', {}).items()}
+        self.rollover_weekday = WEEKDAYS.index(config.get('rollover', 'monday').lower())
+
+        # accepted spellings of a time: t2, s2 (slot) and 2
+        self._times = {}
+        for key in self.slots:
+            number = key.lstrip('abcdefghijklmnopqrstuvwxyz')
+            self._times[key] = key
+            if number:
+                self._times.update({f's{number}': key, number: key})
+
+        # listing filters: d1, t2 and d1t2, with or without a leading -
+        self._filters = {}
+        for day in self.days:
+            self._filters[day] = (day, None)
+            for key in self.slots:
+                self._filters[key] = (None, key)
+                self._filters[f'{day}{key}'] = (day, key)
+
+        # "Day 1 Slot 2", numbered in the order of the config whatever the keys are
+        self._labels = {(day, key): f'Day {d} Slot {t}'
+                        for d, day in enumerate(self.days, start=1) for t, key in enumerate(self.slots, start=1)}
+
+    def init_data(self) -> dict:
+        """The empty registrations of every slot"""
+        return {day: {key: {} for key in self.slots} for day in self.days}
+
+    def slot(self, day: str, time_input: str) -> tuple[str, str] | None:
+        """(day, time) keys of a slot given as typed by a user, None if there is no such slot"""
+        day, key = str(day).lower(), self._times.get(str(time_input).lower())
+        return (day, key) if day in self.days and key else None
+
+    def usage(self) -> str:
+        """How to name a slot, e.g. d1/d2 and t1/t2/t3"""
+        return f"{'/'.join(self.days)} and {'/'.join(self.slots)}"
+
+    def label(self, day: str, time: str) -> str:
+        """How a slot is shown, e.g. Day 1 Slot 2. Slots no longer in the config show their keys"""
+        return self._labels.get((day, time), f'{day} {time}')
+
+    def filter_usage(self) -> str:
+        """How to filter a listing, e.g. d1, t2 or d1t2"""
+        day, time = next(iter(self.days)), next(iter(self.slots))
+        return f"a day, a time slot or both with {self.usage()}, e.g. {day}, {time} or {day}{time}"
+
+    def parse_filter(self, option: str) -> tuple[str | None, str | None] | None:
+        """(day, time) to list, None for any, from d#, t# or d#t#. None if the option is no filter"""
+        return self._filters.get(str(option).lower().lstrip('-'))
+
+    def check_context(self, context: dict):
+        """Raises ValueError if a registration has fields or types the battle does not define"""
+        for field, value in context.items():
+            expected = self.context.get(field)
+            if expected is None:
+                raise ValueError(f'{self.name} has no registration field {field}')
+            if not isinstance(value, expected):
+                raise ValueError(f'{self.name} field {field} must be {expected.__name__}')
+
+    def start_of_week(self, today: date, upcoming: bool = True) -> date:
+        """Date of the first day of the upcoming battle week, or of the last one that started"""
+        if upcoming:
+            return today + timedelta(days=(self.first_weekday - today.weekday()) % 7)
+        return today - timedelta(days=(today.weekday() - self.first_weekday) % 7)
+
+    def dates(self, start: date) -> dict[str, date]:
+        """Date of every day of the battle week starting at start"""
+        return {day: start + timedelta(days=(weekday - self.first_weekday) % 7) for day, weekday in self.days.items()}
+
+
+def load_definitions(path: str = BATTLES_CONFIG) -> dict[str, BattleDefinition]:
+    with open(path, encoding='utf-8') as file:
+        return {name: BattleDefinition(name, config) for name, config in json.load(file).items()}
+
+
+@lru_cache(maxsize=None)
+def battle_definitions() -> dict[str, BattleDefinition]:
+    """The battles config, read once"""
+    return load_definitions()
@@ -1,192 +1,325 @@
-from datetime import datetime, timedelta
+import asyncio
+from datetime import date, datetime, time as day_time, timedelta
+from functools import lru_cache
+from weakref import WeakKeyDictionary
 
 import discord
 import pytz
-from discord.ext import commands
+from discord.ext import commands, tasks
 
+from cogs.battle.balance import Balance, balance
+from cogs.battle.definitions import BattleDefinition, battle_definitions
+from cogs.battle.registration_index import RegistrationIndex
+from core.cortex import Cortex
 from core.ganglia import Memory
 from utils.discord_utils import format_embed_fields
 from utils.logger import init_logger
-from utils.prefs_utils import get_timezone, get_alias
+from utils.prefs_utils import get_timezone, get_alias, get_alias_by_id
 
 DATE_DISPLAY_FORMAT = '%m-%d %H:%M %Z'
-TIME_MAPPING = {"t1": "01:00 UTC", "t2": "11:00 UTC", "t3": "19:00 UTC"}
-TIME_ICON = {"t1": "🕐", "t2": "🕚", "t3": "🕖"}
 PRIMARY_ICON = {"primary": "⚔️️", "secondary": ""}
 
-logger = init_logger('RegisteredBattle')
-
-def get_weekend_dates(user_tz):
-    """Returns the dates for the upcoming Saturday (d1) and Sunday (d2) in the user's local timezone."""
-    today = datetime.now(pytz.UTC)
-    saturday = today + timedelta(days=(5 - today.weekday()) % 7)
-    sunday = saturday + timedelta(days=1)
-
-    user_timezone = pytz.timezone(user_tz)
-    saturday_local = saturday.astimezone(user_timezone)
-    sunday_local = sunday.astimezone(user_timezone)
-    return saturday_local.strftime('%m-%d'), sunday_local.strftime('%m-%d')
-
-def convert_utc_to_local(user_tz: str, utc_date_time: str) -> datetime:
-    """Converts a UTC time string (HH:MM UTC) to the user's local timezone."""
-    user_timezone = pytz.timezone(user_tz)
-    current_year = datetime.now().year
-    utc_dt = datetime.strptime(
-        f'{current_year}-{utc_date_time}',
-        "%Y-%m-%d %H:%M UTC").replace(tzinfo=pytz.UTC)
-
-    return utc_dt.astimezone(user_timezone)
-
-def convert_timeslot_to_utc(day_slot: str, time_slot: str) -> str:
-    """Returns "%m-%d %H:%M UTC" from a d1, t1 and timezone"""
-    d1_date, d2_date = get_weekend_dates('UTC')
-    date_mapping = {"d1": d1_date, "d2": d2_date}
-    return f'{date_mapping.get(day_slot)} {TIME_MAPPING.get(time_slot)}'
-
-
-async def parse_slot_option(ctx, options):
-    try:
-        # Initialize return values as None
-        filtered_day = None
-        filtered_time = None
-
-        option_parts = options[1:].lower()  # Remove the leading -
-
-        # Handle day-only format (-d#)
-        if option_parts.startswith('d') and len(option_parts) == 2:
-            day_num = int(option_parts[1])
-            if day_num in [1, 2]:
-                filtered_day = f"d{day_num}"
-            else:
-                await ctx.send("Invalid day number. Use 1 or 2.")
-                return
-
-        # Handle time-only format (-t#)
-        elif option_parts.startswith('t') and len(option_parts) == 2:
-            time_num = int(option_parts[1])
-            if time_num in [1, 2, 3]:
-                filtered_time = str(time_num)
-            else:
-                await ctx.send("Invalid time slot number.")
-                return
-
-        # Handle combined format (-d#t#)
-        elif len(option_parts) == 4 and option_parts[0] == 'd' and option_parts[2] == 't':
-            day_num = int(option_parts[1])
-            time_num = int(option_parts[3])
-
-            # Validate day number
-            if day_num in [1, 2]:
-                filtered_day = f"d{day_num}"
-            else:
-                await ctx.send("Invalid day number. Use 1 or 2.")
-                return
-
-            # Validate time slot
-            if time_num in [1, 2, 3]:
-                filtered_time = str(time_num)
-            else:
-                await ctx.send("Invalid time slot number.")
-                return
+# listing options other than a day and time filter, the first ones list empty slots too
+SHOW_ALL_OPTIONS = ('a', 'all')
+LIST_OPTIONS = (*SHOW_ALL_OPTIONS, '', 'non-empty')
 
-        else:
-            await ctx.send("Invalid format. Use -d# or -t# or -d#t# (e.g., -d1, -t2, or -d1t2)")
-            return
-
-    except (IndexError, ValueError):
-        await ctx.send("Invalid format. Use -d# or -t# or -d#t# (e.g., -d1, -t2, or -d1t2)")
-        return
+logger = init_logger('RegisteredBattle')
 
-    logger.info(f"Filtering for {filtered_day} {filtered_time}")
-    return filtered_day, filtered_time
+class SlotTimes:
+    """
+    UTC start of every (day, time) slot of one battle week, and the local time of a slot
+    rendered once per timezone. Built once per week, see slot_times()
+    """
+
+    def __init__(self, definition: BattleDefinition, start: date):
+        self.start = start
+        days = definition.dates(start)
+        self.dates = {day: slot_date.strftime('%m-%d') for day, slot_date in days.items()}
+        self.utc = {(day, time): datetime.combine(slot_date, slot_time, tzinfo=pytz.UTC)
+                    for day, slot_date in days.items() for time, slot_time in definition.slots.items()}
+        self._local: dict[tuple, str] = {}
+
+    def utc_label(self, day: str, time: str) -> str:
+        """"%m-%d %H:%M UTC" of a slot"""
+        return self.utc[(day, time)].strftime('%m-%d %H:%M UTC')
+
+    def local(self, day: str, time: str, user_tz: str) -> str:
+        """Start of a slot in DATE_DISPLAY_FORMAT in the timezone"""
+        key = (day, time, user_tz)
+        local_time = self._local.get(key)
+        if local_time is None:
+            local_time = self.utc[(day, time)].astimezone(pytz.timezone(user_tz)).strftime(DATE_DISPLAY_FORMAT)
+            self._local[key] = local_time
+        return local_time
+
+
+@lru_cache(maxsize=8)
+def _slot_table(definition: BattleDefinition, start: date) -> SlotTimes:
+    return SlotTimes(definition, start)
+
+def slot_times(definition: BattleDefinition) -> SlotTimes:
+    """Slot times of the upcoming battle week"""
+    return _slot_table(definition, definition.start_of_week(datetime.now(pytz.UTC).date()))
+
+# guild cortex -> lock held while a battle reads and appends to a week of the battle history, every battle
+# of a guild appends to the same weeks
+_history_locks: WeakKeyDictionary[Cortex, asyncio.Lock] = WeakKeyDictionary()
+
+def history_lock(cortex: Cortex) -> asyncio.Lock:
+    lock = _history_locks.get(cortex)
+    if lock is None:
+        lock = _history_locks[cortex] = asyncio.Lock()
+    return lock
+
+def week_key(dt: date) -> str:
+    """ISO week of a date, e.g. 2025-W08"""
+    year, week, _ = dt.isocalendar()
+    return f'{year}-W{week:02d}'
 
 
 class RegisteredBattle(commands.Cog):
-    def __init__(self, title: str, memory: Memory, bot):
-        self.battle_title = title
+    """
+    Registration for a battle type of the battles config, see cogs.battle.definitions.
+    A battle cog passes its memory and adds the commands calling register, unregister and the listings
+    """
+
+    def __init__(self, memory: Memory, bot, definition: BattleDefinition = None):
+        self.definition = definition or battle_definitions()[memory.type]
+        self.battle_title = self.definition.title
         self.memory = memory
         self.cortex = bot.cortex
-        self.max_team_size = 30
-        self.cortex.initialize_memory(
-            memory, {
-                # Dictionary to store team registrations
-                "d1": {"t1": {}, "t2": {}, "t3": {}},
-                "d2": {"t1": {}, "t2": {}, "t3": {}}
-            })
+
+        # Dictionary to store team registrations, day -> time -> user id -> entry
+        self.cortex.initialize_memory(memory, self.definition.init_data())
+        self.cortex.register_event_view(memory, self.describe_events)
+
+        # registrations by user of each guild cortex, see get_index
+        self._indexes: WeakKeyDictionary[Cortex, RegistrationIndex] = WeakKeyDictionary()
+        # the due week each guild cortex was last rolled over to, see catch_up
+        self._rolled_over: WeakKeyDictionary[Cortex, date] = WeakKeyDictionary()
+        # the last balance proposed in each guild cortex, see propose_balance
+        self._balances: WeakKeyDictionary[Cortex, Balance] = WeakKeyDictionary()
+
+    async def cog_load(self):
+        await self.catch_up(self.cortex, datetime.now(pytz.UTC))
+        self.weekly_rollover.start()
+
+    async def cog_unload(self):
+        self.weekly_rollover.cancel()
+
+    # every day at midnight UTC, rolls over on the rollover day of the battle
+    @tasks.loop(time=day_time(hour=0))
+    async def weekly_rollover(self):
+        await self.rollover(datetime.now(pytz.UTC))
+
+    @weekly_rollover.error
+    async def weekly_rollover_error(self, error: BaseException):
+        logger.error(f"Failed to roll over {self.battle_title}: {error}")
+
+    async def guild_cortex(self, ctx) -> Cortex:
+        """The cortex of the guild of a command, its registrations rolled over if a rollover was missed"""
+        cortex = self.cortex.for_guild(ctx.guild)
+        await self.catch_up(cortex, datetime.now(pytz.UTC))
+        return cortex
+
+    def due_week(self, now: datetime) -> date:
+        """Start of the battle week the last rollover day up to now archives"""
+        rollover_day = now.date() - timedelta(days=(now.weekday() - self.definition.rollover_weekday) % 7)
+        return self.definition.start_of_week(rollover_day - timedelta(days=1), upcoming=False)
+
+    async def rollover(self, now: datetime) -> int:
+        """Roll over the registrations of every open guild, see catch_up. Returns the number archived"""
+        archived = 0
+        for cortex in self.cortex.guild_cortices():
+            archived += await self.catch_up(cortex, now)
+        return archived
+
+    async def catch_up(self, cortex: Cortex, now: datetime) -> int:
+        """
+        Roll over the registrations of a guild if the last rollover day up to now has not been rolled over,
+        e.g. the bot was down or the guild was closed at midnight. Every rollover is recorded in the history,
+        the registrations belong to the battle week after the last one recorded.
+        Returns the number of registrations archived
+        """
+        due = self.due_week(now)
+        if self._rolled_over.get(cortex) == due:
+            return 0
+
+        archived = 0
+        async with history_lock(cortex):
+            if not await self.is_archived(cortex, due):
+                # the registrations belong to the week after the last one rolled over
+                for weeks in range(1, 53):
+                    if await self.is_archived(cortex, due - timedelta(weeks=weeks)):
+                        archived = await self.rollover_guild(cortex, due - timedelta(weeks=weeks - 1))
+                        # the weeks missed since had no registrations, recorded so the next rollover is due's
+                        for missed in range(weeks - 2, -1, -1):
+                            await self.record_rollover(cortex, due - timedelta(weeks=missed), {})
+                        await cortex.remember(Memory.BATTLE_HISTORY)
+                        break
+                else:
+                    # no rollover recorded, the registrations may be for the upcoming battle and are kept
+                    await self.record_rollover(cortex, due, {})
+                    await cortex.remember(Memory.BATTLE_HISTORY)
+        self._rolled_over[cortex] = due
+        return archived
+
+    async def record_rollover(self, cortex: Cortex, start: date, slots: dict) -> bool:
+        """Append the rosters of a battle week to the history. False if the week is archived already"""
+        week = week_key(start)
+        history = await cortex.get_memory(Memory.BATTLE_HISTORY, week)
+        if self.memory.type in history:
+            logger.warning(f"{self.memory.type} of {week} is archived already, not overwriting it")
+            return False
+
+        history[self.memory.type] = {
+            "dates": {day: slot_date.strftime('%m-%d') for day, slot_date in self.definition.dates(start).items()},
+            "slots": slots}
+        await cortex.update_memory(Memory.BATTLE_HISTORY, week, history)
+        return True
+
+    async def is_archived(self, cortex: Cortex, start: date) -> bool:
+        history = await cortex.get_memory(Memory.BATTLE_HISTORY, week_key(start))
+        return self.memory.type in history
+
+    async def rollover_guild(self, cortex: Cortex, start: date) -> int:
+        """
+        Append the rosters of the battle week starting at start to the battle history, under its ISO week,
+        and remove the archived registrations for the next week. Weeks without registrations are recorded too, see catch_up.
+        Callers hold the history_lock of the cortex. Returns the number of registrations archived
+        """
+        week = week_key(start)
+        teams = (await cortex.get_snapshot(self.memory)).data
+
+        # only the filled slots are kept, without the context wrapper
+        slots = {}
+        for day, day_slots in teams.items():
+            for time, members in day_slots.items():
+                if members:
+                    slots.setdefault(day, {})[time] = {user_id: dict(entry.get('context', {}))
+                                                       for user_id, entry in members.items()}
+        archived = sum(len(members) for day_slots in slots.values() for members in day_slots.values())
+
+        # history is append only, a week archived already is kept as it was along with the registrations
+        if not await self.record_rollover(cortex, start, slots):
+            return 0
+
+        # registrations made or changed while archiving are kept for the next week
+        for day, day_slots in slots.items():
+            live_slots = await cortex.get_memory(self.memory, day)
+            for time, members in day_slots.items():
+                live_members = live_slots.get(time, {})
+                for user_id, context in members.items():
+                    if user_id in live_members and live_members[user_id].get('context', {}) == context:
+                        del live_members[user_id]
+            await cortex.update_memory(self.memory, day, live_slots)
+        await cortex.remember()
+        logger.info(f"Rolled over {self.battle_title} of {week}, archived {archived} registrations")
+        return archived
+
+    async def get_index(self, cortex: Cortex) -> RegistrationIndex:
+        """The registrations by user, rebuilt when the memory changed outside of this cog"""
+        index = self._indexes.get(cortex)
+        version = cortex.get_version(self.memory)
+        if index is None or index.version != version:
+            snapshot = await cortex.get_snapshot(self.memory)
+            index = self._indexes[cortex] = RegistrationIndex(snapshot.data, snapshot.version)
+        return index
+
+    def stamp_index(self, cortex: Cortex, index: RegistrationIndex, stale_version: int):
+        """Mark an index updated along with the memory as current"""
+        if index.version == stale_version:
+            index.version = cortex.get_version(self.memory)
 
     async def register(self, ctx,
                        day: str = commands.parameter(description="use d1 or d2"),
                        time: str = commands.parameter(description="use t1, t2 or t3"),
                        **context):
         """Register user for a specific day and time slot."""
-        day = day.lower()
-        time = 't' + time[1:].lower()  # allow slot and time
-
-
-        day_slots = await self.cortex.get_memory(self.memory)
-        if day not in day_slots or time not in day_slots[day]:
-            await ctx.send("Invalid day or time slot. Use d1/d2 and t1/t2/t3.")
+        cortex = await self.guild_cortex(ctx)
+        slot = self.definition.slot(day, time)  # allow slot and time
+        if slot is None:
+            await ctx.send(f"Invalid day or time slot. Use {self.definition.usage()}.")
+            return
+        try:
+            self.definition.check_context(context)
+        except ValueError as e:
+            await ctx.send(f"Invalid registration: {e}.")
             return
 
-        time_slot: dict = day_slots[day][time]
+        day, time = slot
+        day_slots: dict = await cortex.get_memory(self.memory, day)
+        time_slot: dict = day_slots.setdefault(time, {})  # slots added to the config start empty
         user_id = str(ctx.author.id)  # Ensure user_id is stored as a string for JSON compatibility
+        index = await self.get_index(cortex)
+
+        capacity = self.definition.capacities[time]
+        if user_id not in time_slot and len(time_slot) >= capacity:
+            await ctx.send(f"This time slot is full ({capacity} players max). Try another slot.")
+            return
 
-        # If registering as primary, remove primary flag from all other slots
+        # If registering as primary, remove primary flag from the user's other slots
+        changed_days = {day: day_slots}
+        cleared = []
         if context.get('primary', False):
-            for d in day_slots:
-                for t in day_slots[d]:
-                    if user_id in day_slots[d][t] and day_slots[d][t][user_id]['context'].get('primary', False):
-                        if d == day and t == time:
-                            continue  # Skip current slot
-                        # Remove primary flag from other slot
-                        day_slots[d][t][user_id]['context']['primary'] = False
-                        await ctx.send(f"Removed primary {d} {t} slot")
+            for d, t in index.primary_slots(user_id):
+                if d == day and t == time:
+                    continue  # Skip current slot
+                changed_days.setdefault(d, await cortex.get_memory(self.memory, d))
+                changed_days[d][t][user_id]['context']['primary'] = False
+                cleared.append((d, t))
+            if cleared:
+                await ctx.send(f"Removed primary {', '.join(f'{d} {t}' for d, t in cleared)} slot")
 
         if user_id in time_slot:
             await ctx.send("Updating your entry for this slot!")
             time_slot[user_id]["context"].update(context)  # Update existing entry instead of overwriting
-
         else:
-            if len(time_slot) >= self.max_team_size:
-                await ctx.send(f"This time slot is full ({self.max_team_size} players max). Try another slot.")
-                return
-
             # Create new entry
             time_slot[user_id] = {"context": context}
 
-        await self.cortex.remember(self.memory)
+        stale_version = cortex.get_version(self.memory)
+        for d, slots in changed_days.items():
+            await cortex.update_memory(self.memory, d, slots)
+        for d, t in [*cleared, (day, time)]:
+            index.add(user_id, d, t, changed_days[d][t][user_id]['context'])
+        self.stamp_index(cortex, index, stale_version)
+        await cortex.remember(self.memory)
 
         # User data
-        user_prefs = await self.cortex.get_preferences(ctx)
+        user_prefs = await cortex.get_preferences(ctx)
         user_tz = get_timezone(user_prefs)
         user_alias = get_alias(user_prefs)
 
-        utc_datetime = convert_timeslot_to_utc(day, time)
-        local_time = convert_utc_to_local(user_tz, utc_datetime)
-        await ctx.send(f"{user_alias} has been registered for {local_time.strftime(DATE_DISPLAY_FORMAT)}")
+        await ctx.send(f"{user_alias} has been registered for {slot_times(self.definition).local(day, time, user_tz)}")
 
     async def unregister(self, ctx,
                      day: str = commands.parameter(description="use d1 or d2"),
                      time: str = commands.parameter(description="use t1, t2 or t3")):
         """Remove user from a specific day and time slot."""
-        day = day.lower()
-        time = 't' + time[1:].lower()  # allow slot and time
-
-        teams = await self.cortex.get_memory(self.memory)
-        if day not in teams or time not in teams[day]:
-            await ctx.send("Invalid day or time slot. Use d1/d2 and t1/t2/t3.")
+        cortex = await self.guild_cortex(ctx)
+        slot = self.definition.slot(day, time)  # allow slot and time
+        if slot is None:
+            await ctx.send(f"Invalid day or time slot. Use {self.definition.usage()}.")
             return
 
-        team: dict = teams[day][time]
+        day, time = slot
+        day_slots: dict = await cortex.get_memory(self.memory, day)
+        team: dict = day_slots.get(time, {})
         user_id = str(ctx.author.id)
 
         # User data
-        user_prefs = await self.cortex.get_preferences(ctx)
+        user_prefs = await cortex.get_preferences(ctx)
         user_alias = get_alias(user_prefs)
 
         if user_id in team:
+            index = await self.get_index(cortex)
             del team[user_id]  # Remove the user from the time slot
-            await self.cortex.remember(self.memory)
+            stale_version = cortex.get_version(self.memory)
+            await cortex.update_memory(self.memory, day, day_slots)
+            index.remove(user_id, day, time)
+            self.stamp_index(cortex, index, stale_version)
+            await cortex.remember(self.memory)
             logger.info("Successfully removed.")
             await ctx.send(f"{user_alias} has been removed from {day.upper()} {time.upper()}.")
         else:
@@ -195,8 +328,8 @@ class RegisteredBattle(commands.Cog):
 
 
     @staticmethod
-    def format_member(prefs: dict, entry: dict, user_datetime: datetime):
-        return f'{prefs.get("alias", "Unknown")} ({user_datetime.strftime(DATE_DISPLAY_FORMAT)})'
+    def format_member(prefs: dict, entry: dict, local_time: str):
+        return f'{prefs.get("alias", "Unknown")} ({local_time})'
 
 
     async def list_registration(self, ctx,
@@ -206,18 +339,147 @@ class RegisteredBattle(commands.Cog):
                                 format_member_details: callable = format_member):
 
         """List current registration information in UTC."""
-        d1_date, d2_date = get_weekend_dates('UTC')
-        day_mapping = {"d1": d1_date, "d2": d2_date}
-
-        all_prefs = await self.cortex.get_all_preferences()
-        embed = discord.Embed(title=self.battle_title, color=discord.Color.dark_gold())
-        teams = await self.cortex.get_memory(self.memory)
 
-        # Parse -d#t# option
+        # Parse the day and time filter of the battle, the list options are passed on
+        options = options.lower() if isinstance(options, str) else ""
         filtered_day = None
         filtered_time = None
-        if isinstance(options, str) and options.startswith("d"):
-            filtered_day, filtered_time = await parse_slot_option(ctx, options)
+        if options.lstrip('-') not in LIST_OPTIONS:
+            slot_filter = self.definition.parse_filter(options)
+            if slot_filter is None:
+                await ctx.send(f"Invalid format. Use {self.definition.filter_usage()}")
+                return
+            filtered_day, filtered_time = slot_filter
+            logger.info(f"Filtering for {filtered_day} {filtered_time}")
+
+        embed = await self.build_registration_embed(await self.guild_cortex(ctx), options, format_member_details,
+                                                    filtered_day, filtered_time)
+        await ctx.send(embed=embed)
+
+    async def list_mine(self, ctx, format_member_details: callable = format_member):
+        """List the slots the user is registered for, in the user's timezone."""
+        cortex = await self.guild_cortex(ctx)
+        user_prefs = await cortex.get_preferences(ctx)
+        user_tz = get_timezone(user_prefs)
+        slots = (await self.get_index(cortex)).user_slots(str(ctx.author.id))
+        table = slot_times(self.definition)
+
+        embed = discord.Embed(title=f"{self.battle_title} - {get_alias(user_prefs)}", color=discord.Color.dark_gold())
+        for (day, time), context in sorted(slots.items()):
+            local_time = table.local(day, time, user_tz)
+            embed.add_field(name=f"🗓️ {self.definition.label(day, time)} ({table.utc_label(day, time)})",
+                            value=format_member_details(user_prefs, {"context": context}, local_time),
+                            inline=False)
+
+        if not embed.fields:
+            embed.description = "You are not registered for any slot."
+        await ctx.send(embed=embed)
+
+    async def list_history(self, ctx, weeks: int = 4):
+        """List the slots the user was registered for in the past weeks, read from the history a week at a time."""
+        cortex = await self.guild_cortex(ctx)
+        user_prefs = await cortex.get_preferences(ctx)
+        user_id = str(ctx.author.id)
+        weeks = min(max(int(weeks), 1), 52)
+
+        embed = discord.Embed(title=f"{self.battle_title} history - {get_alias(user_prefs)}",
+                              color=discord.Color.dark_gold())
+        start = self.definition.start_of_week(datetime.now(pytz.UTC).date(), upcoming=False)
+        for week in (week_key(start - timedelta(weeks=i)) for i in range(weeks)):
+            roster = (await cortex.get_memory(Memory.BATTLE_HISTORY, week)).get(self.memory.type)
+            if not roster or not roster["slots"]:
+                continue
+
+            primary = f" {PRIMARY_ICON['primary']}"
+            slots = [self.definition.label(day, time) + (primary if members[user_id].get('primary') else "")
+                     for day, day_slots in sorted(roster["slots"].items())
+                     for time, members in sorted(day_slots.items()) if user_id in members]
+            embed.add_field(name=f"{week} ({' / '.join(roster['dates'].values())})",
+                            value=", ".join(slots) or "Not registered", inline=False)
+
+        if not embed.fields:
+            embed.description = f"No {self.battle_title} in the last {weeks} weeks."
+        await ctx.send(embed=embed)
+
+    async def propose_balance(self, ctx, role_key: str = 'role'):
+        """
+        Work out a placement of every registrant within the slot capacities and close to the role targets,
+        and list the primary slots it moves. Nothing changes until apply_balance
+        """
+        cortex = await self.guild_cortex(ctx)
+        snapshot = await cortex.get_snapshot(self.memory)
+        teams = snapshot.data
+        proposal = balance(teams, self.definition.capacities, self.definition.targets, role_key)
+        proposal.version = snapshot.version
+        self._balances[cortex] = proposal
+
+        all_prefs = await cortex.get_all_preferences()
+        table = slot_times(self.definition)
+
+        def slot_name(slot):
+            return f"{slot[0].upper()} {slot[1].upper()}" if slot else "unplaced"
+
+        moves = [f"{get_alias_by_id(user_id, all_prefs)}: {slot_name(old)} → {slot_name(new)}"
+                 for user_id, old, new in proposal.moves]
+        if len(moves) > 20:
+            moves[20:] = [f"... and {len(moves) - 20} more"]
+
+        embed = discord.Embed(title=f"{self.battle_title} balance", color=discord.Color.dark_gold(),
+                              description="\n".join(moves) or "The rosters are balanced, nothing to move.")
+        composition = proposal.composition(teams, role_key)
+        for day, day_slots in teams.items():
+            for time in day_slots:
+                roles = composition.get((day, time), {})
+                if not roles:
+                    continue
+                counts = ", ".join(f"{role} {count}/{self.definition.targets[role]}" if role in self.definition.targets
+                                   else f"{role} {count}" for role, count in sorted(roles.items()))
+                embed.add_field(name=f"🗓️ {self.definition.label(day, time)} ({table.utc_label(day, time)}) - "
+                                     f"{sum(roles.values())}/{self.definition.capacities.get(time, 0)}",
+                                value=counts, inline=False)
+        if proposal.moves:
+            embed.set_footer(text=f"Use the apply option to make these {len(proposal.moves)} moves")
+        await ctx.send(embed=embed)
+
+    async def apply_balance(self, ctx):
+        """Move the primary slots of the last proposed balance, if the registrations did not change since"""
+        cortex = await self.guild_cortex(ctx)
+        proposal = self._balances.get(cortex)
+        if proposal is None or proposal.version != cortex.get_version(self.memory):
+            await ctx.send("The registrations changed since the last balance, review a new one before applying it.")
+            return
+
+        index = await self.get_index(cortex)
+        changed_days = {}
+        for user_id, old, new in proposal.moves:
+            for slot, primary in ((old, False), (new, True)):
+                if slot is None:
+                    continue
+                day, time = slot
+                day_slots = changed_days.setdefault(day, await cortex.get_memory(self.memory, day))
+                day_slots[time][user_id]['context']['primary'] = primary
+
+        stale_version = cortex.get_version(self.memory)
+        for day, day_slots in changed_days.items():
+            await cortex.update_memory(self.memory, day, day_slots)
+        for user_id, old, new in proposal.moves:
+            for day, time in filter(None, (old, new)):
+                index.add(user_id, day, time, changed_days[day][time][user_id]['context'])
+        self.stamp_index(cortex, index, stale_version)
+        await cortex.remember(self.memory)
+        del self._balances[cortex]
+
+        logger.info(f"Balanced {self.battle_title}, moved {len(proposal.moves)} primary slots")
+        await ctx.send(f"Moved {len(proposal.moves)} primary slots.")
+
+    async def build_registration_embed(self, cortex: Cortex, options: str = "non-empty",
+                                       format_member_details: callable = format_member,
+                                       filtered_day: str = None, filtered_time: str = None) -> discord.Embed:
+        """The embed listing the registrations of every slot, or of the filtered day and time"""
+        table = slot_times(self.definition)
+        all_prefs = await cortex.get_all_preferences()
+        embed = discord.Embed(title=self.battle_title, color=discord.Color.dark_gold())
+        teams = (await cortex.get_snapshot(self.memory)).data
 
         for day, slots in teams.items():
             # Skip if filtered_day is set and doesn't match current day
@@ -229,24 +491,28 @@ class RegisteredBattle(commands.Cog):
                 if filtered_time and time != filtered_time:
                     continue
 
-                logger.info(f"Listing entries for {day} {slots}")
-                utc_time = TIME_MAPPING[time]
-                utc_date = day_mapping[day]
+                logger.info(f"Listing {len(members)} entries for {day} {time}")
 
                 member_details = []
                 for user_id, entry in members.items():
                     prefs = all_prefs.get(user_id, {})
-                    logger.info(f"Listing {prefs} for registered battle")
-                    user_datetime = convert_utc_to_local(prefs.get('timezone', 'UTC'), f'{utc_date} {utc_time}')
+                    local_time = table.local(day, time, prefs.get('timezone', 'UTC'))
 
                     # Apply lambda transformation
-                    member_details.append(format_member_details(prefs, entry, user_datetime) + "\n")
+                    member_details.append(format_member_details(prefs, entry, local_time) + "\n")
 
                 # only display for non-empty list
-                if members or "all" in options or "a" in options:
-                    embed.add_field(name=f"🗓️ Day {day[1]} Slot {time[1]} ({utc_date} {utc_time})",
+                if members or options.lstrip('-') in SHOW_ALL_OPTIONS:
+                    embed.add_field(name=f"🗓️ {self.definition.label(day, time)} ({table.utc_label(day, time)})",
                                     value=f"{''.join(member_details) if members else 'No registrations'}",
                                     inline=False)
+        return embed
 
-        await ctx.send(embed=embed)
-        await self.cortex.record_event(self.memory.type, format_embed_fields(embed))
+    @staticmethod
+    def _format_member(prefs: dict, entry: dict, local_time: str):
+        """How members are shown in the event summary, battles override it with their details"""
+        return RegisteredBattle.format_member(prefs, entry, local_time)
+
+    async def describe_events(self, cortex: Cortex) -> str:
+        """Summary of the registrations for the shared events view"""
+        return format_embed_fields(await self.build_registration_embed(cortex, "non-empty", self._format_member))
@@ -0,0 +1,31 @@
+class RegistrationIndex:
+    """
+    Slots of every registered user, user_id -> {(day, time): context}, next to the day/time layout
+    of a battle memory. version is the memory version the index was built from or last updated to.
+    """
+
+    __slots__ = ('_slots', 'version')
+
+    def __init__(self, teams, version: int = None):
+        self._slots: dict[str, dict[tuple, dict]] = {}
+        for day, slots in teams.items():
+            for time, members in slots.items():
+                for user_id, entry in members.items():
+                    self.add(user_id, day, time, entry.get('context', {}))
+        self.version = version
+
+    def user_slots(self, user_id: str) -> dict:
+        """{(day, time): context} of a user, read-only"""
+        return self._slots.get(user_id, {})
+
+    def primary_slots(self, user_id: str) -> list:
+        return [slot for slot, context in self.user_slots(user_id).items() if context.get('primary', False)]
+
+    def add(self, user_id: str, day: str, time: str, context: dict):
+        self._slots.setdefault(user_id, {})[(day, time)] = dict(context)
+
+    def remove(self, user_id: str, day: str, time: str):
+        slots = self._slots.get(user_id, {})
+        slots.pop((day, time), None)
+        if not slots:
+            self._slots.pop(user_id, None)
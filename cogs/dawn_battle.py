@@ -4,9 +4,9 @@ functionality to handle class-based battle registration through Discord commands
 
 The module supports various character classes including Sage, ShadowWalker, Monk,
 Centurion, Ranger, Guardian, Zealot, and Magistrate, with multiple aliases for each class.
+The title, days, time slots and capacity are defined in the battles config (config/battles.json).
 
 Constants:
-    BATTLE_NAME (str): The name of the battle system ("Battle of Dawn")
     REGISTRATION_FILE (str): Path to the JSON file storing battle registrations
     CLASS_NAMES (dict): Mapping of class names to their respective aliases
 
@@ -15,16 +15,13 @@ Functions:
 
 """
 
-from datetime import datetime
-
 from discord.ext import commands
 
-from cogs.battle.registered_battle import RegisteredBattle, DATE_DISPLAY_FORMAT, PRIMARY_ICON
+from cogs.battle.registered_battle import RegisteredBattle, PRIMARY_ICON
 from core.ganglia import Memory
+from utils.datetime_utils import has_required_permissions
 from utils.logger import init_logger
 
-BATTLE_NAME = "Battle of Dawn"
-
 CLASS_NAMES = {
     "Sage": ['cs', 'court', 'sage', 'CourtSage'],
     "ShadowWalker": ['sw', 'shadow', 'walker', 'ShadowWalker'],
@@ -52,7 +49,7 @@ def find_class(class_input: str):
 
 class DawnBattle(RegisteredBattle):
     def __init__(self, bot):
-        super().__init__(BATTLE_NAME, Memory.DAWN_BATTLE, bot)
+        super().__init__(Memory.DAWN_BATTLE, bot)
 
 
     @commands.command(name="dawn.add", aliases=['d.add', 'dawn', 'd'])
@@ -99,15 +96,37 @@ class DawnBattle(RegisteredBattle):
         await self.list_registration(
             ctx,
             options,
-            lambda prefs, entry, user_datetime: self._format_member(prefs, entry, user_datetime))
+            lambda prefs, entry, local_time: self._format_member(prefs, entry, local_time))
+
+    @commands.command(name="dawn.mine", aliases=['d.mine'])
+    async def mine(self, ctx):
+        """List the slots you are registered for."""
+
+        await self.list_mine(
+            ctx,
+            lambda prefs, entry, local_time: self._format_member(prefs, entry, local_time))
+
+    @commands.command(name="dawn.history", aliases=['d.history', 'dawn.hist'])
+    async def history(self, ctx, weeks: int = commands.parameter(description="number of past weeks", default=4)):
+        """List the slots you were registered for in the past weeks."""
+        await self.list_history(ctx, weeks)
+
+    @commands.command(name="dawn.balance", aliases=['d.balance'])
+    @has_required_permissions()
+    async def balance(self, ctx, options: str = commands.parameter(description="apply: make the proposed moves", default="")):
+        """Propose primary slot moves that balance the classes of every slot, then apply them."""
+        if isinstance(options, str) and options.lower().lstrip('-') == "apply":
+            await self.apply_balance(ctx)
+        else:
+            await self.propose_balance(ctx, "role")
 
     @staticmethod
-    def _format_member(prefs: dict, entry: dict, user_datetime: datetime):
+    def _format_member(prefs: dict, entry: dict, local_time: str):
         context = entry.get('context', {})
         role = context.get('role', 'Unknown')
         is_primary = entry.get('context', {}).get('primary', False)
         icon = PRIMARY_ICON["primary"] if is_primary else PRIMARY_ICON["secondary"]
-        return f'{icon} [**{role}**] {prefs.get("alias", "Unknown")} ({user_datetime.strftime(DATE_DISPLAY_FORMAT)})'
+        return f'{icon} [**{role}**] {prefs.get("alias", "Unknown")} ({local_time})'
 
 
 # Add the cog to the bot
@@ -0,0 +1,47 @@
+import discord
+from discord.ext import commands
+
+from core.cortex import Cortex
+from utils.cache_utils import cache_stats
+from utils.datetime_utils import has_required_permissions
+from utils.logger import init_logger
+
+logger = init_logger('Diagnostics')
+
+
+class Diagnostics(commands.Cog):
+    def __init__(self, bot):
+        self.cortex: Cortex = bot.cortex
+
+    @commands.command(name='wolfie.stats', aliases=['wolfie.diag'])
+    @has_required_permissions()
+    async def stats(self, ctx):
+        """Show how long commands waited on memory locks, and how often rendered output was reused."""
+
+        embed = discord.Embed(title="Wolfie Memory Locks", color=discord.Color.dark_embed())
+        lock_stats = sorted(self.cortex.lock_stats().items(), key=lambda item: item[1]['wait_ms'], reverse=True)
+        for name, stats in lock_stats:
+            average_ms = stats['wait_ms'] / stats['contended'] if stats['contended'] else 0
+            embed.add_field(
+                name=name,
+                value=f"{stats['acquired']} acquired, {stats['contended']} waited "
+                      f"(avg {average_ms:.1f} ms, max {stats['max_wait_ms']:.1f} ms)",
+                inline=False)
+
+        for name, stats in cache_stats().items():
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / lookups * 100 if lookups else 0
+            embed.add_field(
+                name=f"cache {name}",
+                value=f"{stats['hits']} hits, {stats['misses']} misses ({hit_rate:.0f}%), {stats['size']} cached",
+                inline=False)
+
+        if not embed.fields:
+            embed.description = "No memory access yet."
+
+        logger.info(f"lock stats: {dict(lock_stats)}, cache stats: {cache_stats()}")
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(Diagnostics(bot))
@@ -41,8 +41,9 @@ class Preferences(commands.Cog):
             return
 
         # Prepare the preference data
+        cortex = self.cortex.for_guild(ctx.guild)
         user_id = str(ctx.author.id)
-        pref = await self.cortex.get_preferences(ctx)
+        pref = await cortex.get_preferences(ctx)
         new_pref = {
             'name': ctx.author.display_name,
             'alias': alias,
@@ -52,11 +53,11 @@ class Preferences(commands.Cog):
         # Perform the update
         if any(pref.get(k) != v for k, v in new_pref.items()):
             pref.update(new_pref)
-            await self.cortex.update_memory(Memory.PREFERENCES, user_id, pref)
+            await cortex.update_memory(Memory.PREFERENCES, user_id, pref)
             embed = discord.Embed(title=NAME_LIST_TITLE,
                               color=discord.Color.dark_embed())
             embed.add_field(name=f"{ctx.author.name}", value=f"is known to wolfie as {alias}", inline=False)
-            await self.cortex.remember(self.memory)
+            await cortex.remember(self.memory)
         else:
             logger.info("preferences not changed")
             await ctx.send("Wolfie already knows your name")
@@ -75,13 +76,14 @@ class Preferences(commands.Cog):
             try:
                 zone:str = pytz.timezone(timezone_name).zone  # Validate timezone
 
-                pref = await self.cortex.get_preferences(ctx)
+                cortex = self.cortex.for_guild(ctx.guild)
+                pref = await cortex.get_preferences(ctx)
                 pref.update({
                     'name': ctx.author.display_name,
                     'timezone' : zone
                 })
-                await self.cortex.update_memory(Memory.PREFERENCES, str(ctx.author.id), pref)
-                await self.cortex.remember(self.memory)
+                await cortex.update_memory(Memory.PREFERENCES, str(ctx.author.id), pref)
+                await cortex.remember(self.memory)
 
                 await ctx.send(f"Timezone set to {zone}.")
             except pytz.UnknownTimeZoneError:
@@ -95,7 +97,7 @@ class Preferences(commands.Cog):
         # Retrieve all preferences and format into a list of embed fields
         now = datetime.now()
         embed = discord.Embed(title=NAME_LIST_TITLE, color=discord.Color.dark_embed())
-        all_prefs = await self.cortex.get_memory(Memory.PREFERENCES)
+        all_prefs = await self.cortex.for_guild(ctx.guild).get_all_preferences()
         for i, value in enumerate(all_prefs.values(), start=1):
 
             tz = value.get('timezone') or 'UTC'
@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+from operator import attrgetter
+
+from cogs.queue.slot_index import SlotIndex, HOUR_S
+
+DAY_S = 24 * HOUR_S
+
+
+def to_epoch(dt: datetime) -> int:
+    """Seconds since the epoch, dt must be timezone aware"""
+    return int(dt.timestamp())
+
+
+def from_epoch(epoch: int) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+
+class QueueEntry:
+    """
+    A reservation in a title queue. Times are UTC epoch seconds,
+    the ISO string only exists in the stored record.
+    """
+
+    __slots__ = ('epoch', 'user_id', 'alias', '_record')
+
+    def __init__(self, epoch: int, user_id: str, alias: str, record: dict = None):
+        self.epoch = epoch
+        self.user_id = user_id
+        self.alias = alias
+        self._record = record
+
+    @classmethod
+    def from_record(cls, record: dict) -> 'QueueEntry':
+        return cls(to_epoch(datetime.fromisoformat(record["time"])), record["user_id"], record["user_name"], record)
+
+    def to_record(self) -> dict:
+        """The stored form of the entry, formatted once and reused by later saves"""
+        if self._record is None:
+            self._record = {"user_id": self.user_id, "user_name": self.alias, "time": from_epoch(self.epoch).isoformat()}
+        return self._record
+
+    @property
+    def hour(self) -> int:
+        return self.epoch // HOUR_S
+
+    @property
+    def time(self) -> datetime:
+        return from_epoch(self.epoch)
+
+    def __repr__(self):
+        return f'QueueEntry({self.epoch}, {self.user_id!r}, {self.alias!r})'
+
+
+class QueueModel:
+    """
+    Working copy of a stored title queue: entries sorted by time, the cursor, the slot index
+    and the entries of each user, sorted by time.
+    version is the memory version the model was built from or last committed as.
+    """
+
+    __slots__ = ('entries', 'cursor', 'slots', 'by_user', 'version')
+
+    def __init__(self, entries: list, cursor: int = 0, version: int = None):
+        self.entries = sorted(entries, key=attrgetter('epoch'))
+        self.cursor = cursor
+        self.slots = SlotIndex(entry.hour for entry in self.entries)
+        self.by_user: dict[str, list[QueueEntry]] = {}
+        for entry in self.entries:
+            self.by_user.setdefault(entry.user_id, []).append(entry)
+        self.version = version
+
+    @classmethod
+    def from_dict(cls, queue: dict, version: int = None) -> 'QueueModel':
+        return cls([QueueEntry.from_record(record) for record in queue.get("entries", [])],
+                   int(queue.get("cursor", 0)), version)
+
+    def to_dict(self) -> dict:
+        return {"entries": [entry.to_record() for entry in self.entries], "cursor": self.cursor}
+
+    @property
+    def current(self) -> QueueEntry | None:
+        return self.entries[self.cursor] if 0 <= self.cursor < len(self.entries) else None
+
+    def add(self, entry: QueueEntry):
+        insort(self.entries, entry, key=attrgetter('epoch'))
+        self.slots.add(entry.hour)
+        insort(self.by_user.setdefault(entry.user_id, []), entry, key=attrgetter('epoch'))
+
+    def remove(self, entry: QueueEntry):
+        index = self.entries.index(entry)
+        if index <= self.cursor:
+            self.cursor -= 1
+        del self.entries[index]
+        self.slots.remove(entry.hour)
+        self._unindex_user(entry)
+
+    def advance(self, now_epoch: int) -> bool:
+        """Point the cursor at the first entry whose hour has not ended. Returns True if it moved"""
+        cursor = bisect_right(self.entries, now_epoch - HOUR_S, key=attrgetter('epoch'))
+        moved, self.cursor = cursor != self.cursor, cursor
+        return moved
+
+    def archive(self, before_epoch: int) -> list:
+        """Remove and return the entries starting before before_epoch"""
+        count = bisect_left(self.entries, before_epoch, key=attrgetter('epoch'))
+        archived, self.entries = self.entries[:count], self.entries[count:]
+        for entry in archived:
+            self.slots.remove(entry.hour)
+            self._unindex_user(entry)
+        self.cursor = max(self.cursor - count, 0)
+        return archived
+
+    def _unindex_user(self, entry: QueueEntry):
+        user_entries = self.by_user[entry.user_id]
+        user_entries.remove(entry)
+        if not user_entries:
+            del self.by_user[entry.user_id]
+
+    def user_entries(self, user_id: str) -> list:
+        """The entries of a user sorted by time, read-only"""
+        return self.by_user.get(user_id, [])
+
+    def has_entry_within(self, user_id: str, epoch: int, seconds: int = DAY_S) -> bool:
+        return any(abs(epoch - entry.epoch) < seconds for entry in self.user_entries(user_id))
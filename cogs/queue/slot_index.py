@@ -0,0 +1,97 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+
+HOUR_S = 3600
+
+
+def to_epoch_hour(dt: datetime) -> int:
+    """Hours since the epoch, dt must be timezone aware"""
+    return int(dt.timestamp()) // HOUR_S
+
+
+def from_epoch_hour(hour: int) -> datetime:
+    return datetime.fromtimestamp(hour * HOUR_S, tz=timezone.utc)
+
+
+def bit_runs(bits: int) -> list:
+    """(offset, length) of every run of set bits, lowest first"""
+    runs, offset = [], 0
+    while bits:
+        skip = (bits & -bits).bit_length() - 1
+        bits >>= skip
+        offset += skip
+        length = (~bits & (bits + 1)).bit_length() - 1
+        runs.append((offset, length))
+        bits >>= length
+        offset += length
+    return runs
+
+
+class SlotIndex:
+    """
+    Occupied hours of a title queue, as hours since the epoch.
+    A set answers "is this hour taken", a sorted list answers ordered and range queries
+    and a bitmap (bit i is hour _origin + i) answers "which hours of a window are taken".
+    """
+
+    __slots__ = ('_taken', '_hours', '_bits', '_origin')
+
+    def __init__(self, hours=()):
+        self._hours = sorted(hours)
+        self._taken = set(self._hours)
+        self._origin = self._hours[0] if self._hours else 0
+        self._bits = 0
+        for hour in self._taken:
+            self._bits |= 1 << (hour - self._origin)
+
+    def __contains__(self, hour: int) -> bool:
+        return hour in self._taken
+
+    def __len__(self) -> int:
+        return len(self._hours)
+
+    def add(self, hour: int):
+        insort(self._hours, hour)
+        self._taken.add(hour)
+        if not self._bits:
+            self._origin = hour
+        elif hour < self._origin:
+            self._bits <<= self._origin - hour
+            self._origin = hour
+        self._bits |= 1 << (hour - self._origin)
+
+    def remove(self, hour: int):
+        position = bisect_left(self._hours, hour)
+        if position < len(self._hours) and self._hours[position] == hour:
+            del self._hours[position]
+        # older data may hold several entries in one hour
+        if (position >= len(self._hours) or self._hours[position] != hour) and hour in self._taken:
+            self._taken.discard(hour)
+            self._bits &= ~(1 << (hour - self._origin))
+            # keep the bitmap starting at the earliest taken hour
+            if self._bits:
+                skip = (self._bits & -self._bits).bit_length() - 1
+                self._bits >>= skip
+                self._origin += skip
+
+    def next_free(self, after: int, limit: int) -> int | None:
+        """First free hour in (after, after + limit], None if all are taken"""
+        hour = after + 1
+        position = bisect_left(self._hours, hour)
+        while hour <= after + limit:
+            if position == len(self._hours) or self._hours[position] != hour:
+                return hour
+            # skip past every entry of the taken hour
+            position = bisect_right(self._hours, hour, position)
+            hour += 1
+        return None
+
+    def window(self, start: int, hours: int) -> int:
+        """Bitmap of the taken hours in [start, start + hours), bit i is hour start + i"""
+        offset = start - self._origin
+        bits = self._bits >> offset if offset >= 0 else self._bits << -offset
+        return bits & ((1 << hours) - 1)
+
+    def between(self, start: int, end: int) -> list:
+        """Taken hours in [start, end)"""
+        return self._hours[bisect_left(self._hours, start):bisect_left(self._hours, end)]
@@ -0,0 +1,87 @@
+"""
+Bulk import and export of title queues as CSV or JSON lines.
+
+Every row is one entry: queue, user_id, user_name (optional on import) and time (UTC, ISO 8601).
+Rows are read one at a time, a bad row is reported and skipped without stopping the import.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+
+from cogs.queue.model import QueueModel, from_epoch
+
+FIELDS = ("queue", "user_id", "user_name", "time")
+FORMATS = ("csv", "jsonl")
+
+
+class RowError(ValueError):
+    """A row that cannot be imported, line is its line number in the file"""
+
+    def __init__(self, line: int, reason: str):
+        super().__init__(f'line {line}: {reason}')
+        self.line = line
+
+
+def format_of(filename: str) -> str | None:
+    """The transfer format of a file name, None if it is not supported"""
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in FORMATS else None
+
+
+def read_rows(raw: bytes, fmt: str) -> Iterator[tuple[int, dict | RowError]]:
+    """Yields (line, row) for every row of the file, or (line, RowError) for rows that cannot be read"""
+    lines = io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = {"queue", "user_id", "time"} - set(reader.fieldnames or ())
+        if missing:
+            yield 1, RowError(1, f'missing columns {", ".join(sorted(missing))}')
+            return
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(lines, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield line, RowError(line, f'invalid JSON ({e.msg})')
+            continue
+        yield line, row if isinstance(row, dict) else RowError(line, 'expected an object')
+
+
+def parse_time(value: str) -> datetime:
+    """A UTC time of the file, times without an offset are UTC"""
+    dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def write_rows(queues: dict[str, QueueModel], fmt: str) -> bytes:
+    """Every entry of the queues, by queue then time"""
+    rows = ({"queue": queue_name, "user_id": entry.user_id, "user_name": entry.alias,
+             "time": from_epoch(entry.epoch).isoformat()}
+            for queue_name, queue in queues.items() for entry in queue.entries)
+
+    out = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        out.writelines(json.dumps(row) + "\n" for row in rows)
+    return out.getvalue().encode("utf-8")
+
+
+def summarize_errors(errors: Iterable[RowError], limit: int = 20) -> str:
+    """One line per error, the first limit of them"""
+    errors = list(errors)
+    lines = [str(error) for error in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f'... and {len(errors) - limit} more')
+    return "\n".join(lines)
@@ -1,15 +1,22 @@
-import json
-from datetime import datetime, timedelta
+import io
+import os
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from operator import attrgetter
+from weakref import WeakKeyDictionary
 
 import discord
 import pytz
-from dateutil import parser
-from discord.ext import commands
+from discord.ext import commands, tasks
 
-from core.ganglia import Memory
+from cogs.queue.model import QueueEntry, QueueModel, to_epoch
+from cogs.queue.slot_index import HOUR_S, bit_runs, to_epoch_hour, from_epoch_hour
+from cogs.queue.transfer import FORMATS, RowError, format_of, parse_time, read_rows, summarize_errors, write_rows
+from core.cortex import Cortex
+from core.ganglia import Memory, Snapshot
 from tests.conftest import MockContext
-from utils.datetime_utils import parse_datetime, parse_date_input, parse_time_input, \
-    read_iso_datetime
+from utils.datetime_utils import has_required_permissions, parse_datetime, parse_date_input, parse_time_input
+from utils.cache_utils import RenderCache
 from utils.discord_utils import format_embed_fields
 from utils.logger import init_logger
 from utils.prefs_utils import get_timezone, get_alias, get_alias_by_id, get_timezone_by_id
@@ -26,6 +33,12 @@ QUEUES = {
 }
 EMOJIS = {"current": "⏳", "past": "✅", "date": "🗓️", "left": "⬅️", "waiting": "⏳"}
 
+# How far ahead the next available slot is searched
+SLOT_SEARCH_HOURS = 72
+
+# Entries older than this are moved from the queues to the archive at the top of the hour
+QUEUE_RETENTION_HOURS = int(os.getenv('WOLFIE_QUEUE_RETENTION_HOURS', 24))
+
 logger = init_logger('TitleQueue')
 
 class TitleQueue(commands.Cog):
@@ -36,33 +49,130 @@ class TitleQueue(commands.Cog):
             self.memory,
             {queue: {"entries": [], "cursor": 0} for queue in QUEUES})
 
+        # parsed queues by guild cortex, rebuilt when the memory changed outside of this cog.
+        # The models of a guild go away with its cortex once the guild is idle
+        self._queues: WeakKeyDictionary[Cortex, dict[str, QueueModel]] = WeakKeyDictionary()
+
+        # rendered queue.list fields, see build_list_embed
+        self._list_cache = RenderCache('queue.list')
+        self.cortex.register_event_view(self.memory, self.describe_events)
+
+    async def get_queue(self, cortex: Cortex, queue_name: str, snapshot: Snapshot = None) -> QueueModel:
+        """
+        Returns the working model of a queue, built from the stored queue if the memory changed since.
+        Given a snapshot of the queues, the model of that snapshot
+        """
+        snapshot = snapshot or await cortex.get_snapshot(self.memory)
+        models = self._queues.setdefault(cortex, {})
+        queue = models.get(queue_name)
+        if queue is None or queue.version != snapshot.version:
+            queue = QueueModel.from_dict(snapshot.data.get(queue_name, {}), snapshot.version)
+            models[queue_name] = queue
+        return queue
+
+    async def cog_load(self):
+        self.advance_queues.start()
+
+    async def cog_unload(self):
+        self.advance_queues.cancel()
+
+    @tasks.loop(time=[time(hour=hour) for hour in range(24)])
+    async def advance_queues(self):
+        """Hourly: move the cursors to the current slot and archive old entries"""
+        await self.advance(datetime.now(pytz.UTC))
+
+    @advance_queues.error
+    async def advance_queues_error(self, error: BaseException):
+        logger.error(f"Failed to advance the queues: {error}")
+
+    async def advance(self, now: datetime) -> int:
+        """
+        Advance the queues of every open guild, see advance_guild. Guilds closed while idle are
+        skipped, they catch up on the first hourly advance after they are opened again. Returns the number archived
+        """
+        archived = 0
+        for cortex in self.cortex.guild_cortices():
+            archived += await self.advance_guild(cortex, now)
+        return archived
+
+    async def advance_guild(self, cortex: Cortex, now: datetime) -> int:
+        """
+        Advance the cursor of every queue to now and move entries older than the retention
+        window to the archive memory. Changes are persisted together. Returns the number archived
+        """
+        now_epoch = to_epoch(now)
+        archive_before = now_epoch - QUEUE_RETENTION_HOURS * 3600
+        archived = 0
+        changed = False
+
+        for queue_name in QUEUES:
+            queue = await self.get_queue(cortex, queue_name)
+            entries = queue.archive(archive_before)
+            moved = queue.advance(now_epoch)
+            if not entries and not moved:
+                continue
+
+            await self.store_queue(cortex, queue_name, queue)
+            await self.archive_entries(cortex, queue_name, entries)
+            archived += len(entries)
+            changed = True
+
+        if changed:
+            await cortex.remember()
+            logger.info(f"Advanced the queues to {now.isoformat()}, archived {archived} entries")
+        return archived
+
+    async def archive_entries(self, cortex: Cortex, queue_name: str, entries: list):
+        """Append entries to the archive, by month of the entry"""
+        months = {}
+        for entry in entries:
+            months.setdefault(entry.time.strftime("%Y-%m"), []).append(entry.to_record())
+
+        for month, records in months.items():
+            archive = await cortex.get_memory(Memory.TITLE_QUEUE_ARCHIVE, month)
+            archive.setdefault(queue_name, []).extend(records)
+            await cortex.update_memory(Memory.TITLE_QUEUE_ARCHIVE, month, archive)
+
+    async def commit_queue(self, cortex: Cortex, queue_name: str, queue: QueueModel):
+        """Store a changed queue model and persist it"""
+        await self.store_queue(cortex, queue_name, queue)
+        await cortex.remember(self.memory)
+
+    async def store_queue(self, cortex: Cortex, queue_name: str, queue: QueueModel):
+        """Store a changed queue model, it is persisted by the next remember"""
+        stale_version = cortex.get_version(self.memory)
+        await cortex.update_memory(self.memory, queue_name, queue.to_dict())
+        version = cortex.get_version(self.memory)
+
+        # the other queues did not change, their models are still valid
+        for model in self._queues.setdefault(cortex, {}).values():
+            if model.version == stale_version:
+                model.version = version
+
     @staticmethod
-    async def find_next_available_slot(user_tz:str, queue: dict):
+    async def find_next_available_slot(user_tz:str, queue: QueueModel):
         """ find the next time slot based on current entry in the queue"""
 
         # get current entry
-        queue_entries = queue['entries']
-        cursor = queue['cursor']
-        logger.info(f"queue_entries: {json.dumps(queue_entries, indent=2)}, cursor: {cursor}")
+        current_entry = queue.current
+        logger.info(f"queue size: {len(queue.entries)}, cursor: {queue.cursor}, current: {current_entry}")
 
-        current_entry = queue_entries[cursor] \
-            if len(queue_entries) > 0 and cursor < len(queue_entries) else None
         now = datetime.now(pytz.timezone(user_tz))
         if now.minute > 30:
             now = now + timedelta(hours=1)
             logger.info(f"rounding to the next hour {now}")
         now = now.replace(minute=0, second=0, microsecond=0)
-        next_available_dt = read_iso_datetime(current_entry["time"]) if current_entry else now
+        next_available_dt = current_entry.time if current_entry else now
 
         # use next_available_dt only if it's later than now
         dt = next_available_dt if next_available_dt > now else now
-        for i in range(72):  # Check the next 3 days
-            dt = dt + timedelta(hours=1)
-            logger.info(f"next available time + {i} hour={dt} ")
-            if all(read_iso_datetime(entry["time"]) != dt for entry in queue_entries):
-                logger.info(f"found available time: {dt.isoformat()} ")
-                return dt
-        return None
+        hour = queue.slots.next_free(to_epoch_hour(dt), SLOT_SEARCH_HOURS)  # Check the next 3 days
+        if hour is None:
+            return None
+
+        dt = from_epoch_hour(hour).astimezone(pytz.timezone(user_tz))
+        logger.info(f"found available time: {dt.isoformat()} ")
+        return dt
 
     @commands.command(name="queue", aliases=['q', 'q.add'])
     async def queue_add(self, ctx,
@@ -74,7 +184,8 @@ class TitleQueue(commands.Cog):
         - Example: !queue.add sage 2-15 3PM
         - Queue names: tribune, elder, priest, sage, master, praetorian, border, cavalry
         """
-        user_prefs = await self.cortex.get_preferences(ctx)
+        cortex = self.cortex.for_guild(ctx.guild)
+        user_prefs = await cortex.get_preferences(ctx)
         logger.info(f"{user_prefs}\n "
                     f"!Queue.add ctx: {ctx.author.id} ({queue_name}, {start_date}, {start_time}) "
                     f"now: {datetime.now().astimezone(pytz.UTC)}")
@@ -85,16 +196,90 @@ class TitleQueue(commands.Cog):
 
         user_id = str(ctx.author.id)
         user_tz = get_timezone(user_prefs)
+        queue = await self.get_queue(cortex, queue_name)
+
+        dt, error = await self.resolve_slot(queue, user_id, user_tz, start_date, start_time)
+        if error:
+            await ctx.send(error)
+            return
+
+        # queue entry
+        queue.add(QueueEntry(to_epoch(dt), user_id, get_alias(user_prefs)))
+        await self.commit_queue(cortex, queue_name, queue)
+
+        logger.info(f"Successfully added {ctx.author.id} to queue")
+        user_alias = get_alias(user_prefs)
+        await ctx.send(f"Added {user_alias} to {QUEUES[queue_name]} queue at {dt.astimezone(pytz.UTC).strftime('%Y-%m-%d %H:%M UTC')}.")
+
+        if not isinstance(ctx, MockContext): # do not list during testing
+            await self.queue_list(ctx, queue_name)
+
+    @commands.command(name="queue.batch", aliases=['q.batch', 'qq'])
+    async def queue_add_batch(self, ctx, *specs: str):
+        """
+        Add yourself to several queues at once, all or none. Each spec is queue_name[@date][@time].
+        - Example: !queue.batch sage master@3PM tribune@2-15@3PM
+        """
+        cortex = self.cortex.for_guild(ctx.guild)
+        user_prefs = await cortex.get_preferences(ctx)
+        logger.info(f"!Queue.batch ctx: {ctx.author.id} {specs}")
+        if not specs:
+            await ctx.send("Specify at least one queue, e.g. sage master@3PM tribune@2-15@3PM")
+            return
+
+        user_id = str(ctx.author.id)
+        user_tz = get_timezone(user_prefs)
+        user_alias = get_alias(user_prefs)
+
+        requests = []
+        for spec in specs:
+            queue_name, *when = spec.split("@")
+            if queue_name.lower() not in QUEUES or len(when) > 2:
+                await ctx.send(f"Invalid spec {spec}. Use queue_name[@date][@time] "
+                               f"with one of {', '.join(QUEUES.keys())}. Nothing was added.")
+                return
+            requests.append((spec, queue_name.lower(), when))
+        queues = {queue_name: await self.get_queue(cortex, queue_name) for _, queue_name, _ in requests}
+
+        # entries are added to the working models as they are resolved, so later specs see earlier ones
+        added = []
+        for spec, queue_name, when in requests:
+            dt, error = await self.resolve_slot(queues[queue_name], user_id, user_tz, *when)
+            if error:
+                # discard the working models, they are rebuilt from the unchanged memory
+                for name in queues:
+                    self._queues[cortex].pop(name, None)
+                await ctx.send(f"{spec}: {error} Nothing was added.")
+                return
+
+            entry = QueueEntry(to_epoch(dt), user_id, user_alias)
+            queues[queue_name].add(entry)
+            added.append((queue_name, entry))
+
+        for queue_name, queue in queues.items():
+            await self.store_queue(cortex, queue_name, queue)
+        await cortex.remember(self.memory)
+        logger.info(f"Successfully added {ctx.author.id} to {len(added)} queues")
+
+        embed = await self.build_list_embed(cortex, queues)
+        embed.description = f"Added {user_alias} to:\n" + "\n".join(
+            f"{QUEUES[queue_name]} at {entry.time.strftime('%Y-%m-%d %H:%M UTC')}" for queue_name, entry in added)
+        await ctx.send(embed=embed)
+
+    async def resolve_slot(self, queue: QueueModel, user_id: str, user_tz: str,
+                           start_date: str = None, start_time: str = None) -> tuple[datetime | None, str | None]:
+        """
+        Work out the requested slot of a queue and check the user can take it.
+        Defaults to the next available slot. Returns (slot, None), or (None, reason) if it cannot be taken
+        """
         now = datetime.now(pytz.timezone(user_tz))
         now = now.replace(minute=0, second=0, microsecond=0)
-        queue = await self.cortex.get_memory(Memory.TITLE_QUEUES, queue_name)
 
         if not start_date and not start_time:
             dt = await self.find_next_available_slot(user_tz, queue)
             logger.info(f"start date and time not specified, using next available slot: {dt}")
             if not dt:
-                await ctx.send("No available slots in the next 3 days.")
-                return
+                return None, "No available slots in the next 3 days."
         else:
             parsed_date = parse_date_input(start_date, user_tz)
 
@@ -111,54 +296,29 @@ class TitleQueue(commands.Cog):
             logger.info(f"date input: {start_date} = {parsed_date} time input: {start_time} = {parsed_time}")
             dt = parse_datetime(f'{parsed_date} {parsed_time}', user_tz)
 
-        logger.info(f"final parsed datetime: {dt} UTC: {dt.astimezone(pytz.UTC)}")
         if not dt:
             logger.warn(f"Invalid datetime format {start_date} {start_time}")
-            await ctx.send("Invalid start time format. Use 'mm-dd hh'")
-            return
+            return None, "Invalid start time format. Use 'mm-dd hh'"
+        logger.info(f"final parsed datetime: {dt} UTC: {dt.astimezone(pytz.UTC)}")
 
         if dt < now:
             logger.warn("Time is in the past")
-            await ctx.send("Invalid start time. Please specify the hour in the future.")
-            return
+            return None, "Invalid start time. Please specify the hour in the future."
 
-        entries = queue["entries"]
-        if any(e["user_id"] == user_id and abs(dt - datetime.fromisoformat(e["time"])) < timedelta(days=1) for e in
-               entries):
+        if queue.has_entry_within(user_id, to_epoch(dt)):
             logger.warn("Only one entry per day")
-            await ctx.send("You can only register once per queue every 24 hours.")
-            return
+            return None, "You can only register once per queue every 24 hours."
 
         if dt > datetime.now(pytz.UTC) + timedelta(days=3):
             logger.warn("Can only queue 3 days in advanced")
-            await ctx.send("You can only register up to 3 days in advance.")
-            return
+            return None, "You can only register up to 3 days in advance."
 
         logger.info(f"checking available time for: {dt}")
-        for entry in entries:
-            entry_time = read_iso_datetime(entry["time"])
-            logger.info(f"entry time {entry_time}")
-            if entry_time == dt:
-                logger.warn("Slot already taken")
-                await ctx.send(f"Time slot is already taken. Please select another slot.")
-                return
-
-        # queue entry``
-        entries.append({
-            "user_id": user_id,
-            "user_name": get_alias(user_prefs),
-            "time": dt.isoformat()
-         })
-
-        entries.sort(key=lambda e: parser.isoparse(e["time"]))
-        await self.cortex.remember(self.memory)
-
-        logger.info(f"Successfully added {ctx.author.id} to queue")
-        user_alias = get_alias(user_prefs)
-        await ctx.send(f"Added {user_alias} to {QUEUES[queue_name]} queue at {dt.astimezone(pytz.UTC).strftime('%Y-%m-%d %H:%M UTC')}.")
+        if to_epoch_hour(dt) in queue.slots:
+            logger.warn("Slot already taken")
+            return None, "Time slot is already taken. Please select another slot."
 
-        if not isinstance(ctx, MockContext): # do not list during testing
-            await self.queue_list(ctx, queue_name)
+        return dt, None
 
 
     @commands.command(name="queue.remove", aliases=['queue.rm', 'q.rm', 'q.remove'])
@@ -170,7 +330,8 @@ class TitleQueue(commands.Cog):
 		- Example 1: !queue.remove master (remove entry for current day)
 		- Example 2: !queue.remove master 2-23 (remove entry for that that day)
         """
-        user_prefs = await self.cortex.get_preferences(ctx)
+        cortex = self.cortex.for_guild(ctx.guild)
+        user_prefs = await cortex.get_preferences(ctx)
         logger.info(f"{user_prefs}\n "
                     f"!Queue.remove ctx: {ctx.author.id} ({queue_name}, {start_date}) "
                     f"now: {datetime.now().astimezone(pytz.UTC)}")
@@ -182,32 +343,26 @@ class TitleQueue(commands.Cog):
 
         user_id = str(ctx.author.id)
         user_tz = get_timezone(user_prefs)
-        queue =  await self.cortex.get_memory(Memory.TITLE_QUEUES, queue_name)
-        cursor = int(queue['cursor'])
-        entries = queue["entries"]
+        queue = await self.get_queue(cortex, queue_name)
+        user_entries = queue.user_entries(user_id)
 
         if start_date:
             try:
                 parsed_date = parse_date_input(start_date, user_tz)
-                entry_to_remove = next((e for e in entries
-                    if e["user_id"] == user_id and
-                       datetime.fromisoformat(e["time"]).strftime("%Y-%m-%d") == parsed_date), None)
+                entry_to_remove = next((e for e in user_entries
+                    if e.time.astimezone(pytz.timezone(user_tz)).strftime("%Y-%m-%d") == parsed_date), None)
 
             except ValueError:
                 logger.warn(f'Invalid datetime format {start_date}')
                 await ctx.send("Invalid datetime format. Provide the date to remove: 'mm-dd'")
                 return
         else:
-            entry_to_remove = next((e for e in entries if e["user_id"] == user_id), None)
+            entry_to_remove = next(iter(user_entries), None)
 
         if entry_to_remove:
-            # update cursor value
-            entry_index = entries.index(entry_to_remove)
-            if entry_index <= cursor:
-                queue['cursor'] = cursor -1
-
-            entries.remove(entry_to_remove)
-            await self.cortex.remember(self.memory)
+            # the cursor moves back when an entry before it is removed
+            queue.remove(entry_to_remove)
+            await self.commit_queue(cortex, queue_name, queue)
             user_alias = get_alias(user_prefs)
             await ctx.send(f"Removed {user_alias} from {QUEUES[queue_name]} queue.")
 
@@ -221,62 +376,238 @@ class TitleQueue(commands.Cog):
     async def queue_list(self, ctx, *queue_names: str):
         """Display the queue entries. Example: !queue.list sage master ..."""
 
-        queue_names = queue_names or QUEUES.keys()
-        embed = discord.Embed(title="👑 --= IMPERIAL TITLES =-- 👑", color=discord.Color.dark_gold())
-        embed.add_field(name="", value="", inline=False)
+        embed = await self.build_list_embed(self.cortex.for_guild(ctx.guild), queue_names or QUEUES.keys())
+        await ctx.send(embed=embed)
 
-        all_prefs = await self.cortex.get_all_preferences()
-        queues = await self.cortex.get_memory(Memory.TITLE_QUEUES)
-        current_time = datetime.now(pytz.UTC)
-        two_hours_ago = current_time - timedelta(hours=2)
+    @commands.command(name="queue.free", aliases=['q.free'])
+    async def queue_free(self, ctx, *queue_names: str):
+        """Display the free hours of the queues in the next 3 days, in your timezone. Example: !queue.free sage master"""
+        cortex = self.cortex.for_guild(ctx.guild)
+        user_tz = pytz.timezone(get_timezone(await cortex.get_preferences(ctx)))
+        queue_names = [name.lower() for name in queue_names if name.lower() in QUEUES] or list(QUEUES)
+
+        # free hours start at the next hour, bit i of a map is hour start + i
+        start = to_epoch_hour(datetime.now(pytz.UTC)) + 1
+        all_hours = (1 << SLOT_SEARCH_HOURS) - 1
+        free = {name: ~(await self.get_queue(cortex, name)).slots.window(start, SLOT_SEARCH_HOURS) & all_hours
+                for name in queue_names}
+
+        embed = discord.Embed(title="👑 --= FREE TITLE SLOTS =-- 👑", color=discord.Color.dark_gold(),
+                              description=f"Next {SLOT_SEARCH_HOURS} hours in {user_tz}")
+        if len(free) > 1:
+            any_free = 0
+            for bits in free.values():
+                any_free |= bits
+            embed.add_field(name="Any title", value=self.format_free_hours(any_free, start, user_tz), inline=False)
+        for name, bits in free.items():
+            embed.add_field(name=QUEUES[name], value=self.format_free_hours(bits, start, user_tz), inline=False)
+        await ctx.send(embed=embed)
 
-        for queue_name in queue_names:
-            if queue_name.lower() not in QUEUES:
+    @staticmethod
+    def format_free_hours(bits: int, start: int, user_tz) -> str:
+        """Ranges of free hours, e.g. 02-21 14:00-18:00, 02-21 19:00-02-22 02:00"""
+        ranges = []
+        for offset, length in bit_runs(bits):
+            first = from_epoch_hour(start + offset).astimezone(user_tz)
+            end = from_epoch_hour(start + offset + length).astimezone(user_tz)
+            end_format = '%H:%M' if end.date() == first.date() else '%m-%d %H:%M'
+            ranges.append(f"{first.strftime('%m-%d %H:%M')}-{end.strftime(end_format)}")
+        return ", ".join(ranges) or "No free slots"
+
+    @commands.command(name="queue.mine", aliases=['q.mine', 'q.me'])
+    async def queue_mine(self, ctx):
+        """Display your entries in every queue, in your timezone."""
+        cortex = self.cortex.for_guild(ctx.guild)
+        user_prefs = await cortex.get_preferences(ctx)
+        user_tz = pytz.timezone(get_timezone(user_prefs))
+        now_epoch = to_epoch(datetime.now(pytz.UTC))
+
+        embed = discord.Embed(title=f"👑 {get_alias(user_prefs)}'s titles 👑", color=discord.Color.dark_gold())
+        for queue_name, entry in await self.user_reservations(cortex, str(ctx.author.id)):
+            emoji = EMOJIS["past"] if entry.epoch + HOUR_S <= now_epoch \
+                else (EMOJIS["current"] if entry.epoch <= now_epoch else EMOJIS["date"])
+            dt = entry.time
+            embed.add_field(name=f"{emoji} {QUEUES[queue_name]}",
+                            value=f"{dt.astimezone(user_tz).strftime('%m-%d %H:%M')} {user_tz} "
+                                  f"({dt.strftime('%m-%d %H:%M')} UTC)",
+                            inline=False)
+
+        if not embed.fields:
+            embed.description = "You are not in any queue."
+        await ctx.send(embed=embed)
+
+    async def user_reservations(self, cortex: Cortex, user_id: str) -> list:
+        """(queue name, entry) of every entry of a user, sorted by time. Only reads the user's entries"""
+        reservations = [(queue_name, entry) for queue_name in QUEUES
+                        for entry in (await self.get_queue(cortex, queue_name)).user_entries(user_id)]
+        return sorted(reservations, key=lambda reservation: reservation[1].epoch)
+
+    @commands.command(name="queue.import", aliases=['q.import'])
+    @has_required_permissions()
+    async def queue_import(self, ctx):
+        """
+        Add the entries of an attached .csv or .jsonl file to the queues.
+        - Columns: queue, user_id, user_name (optional), time (UTC, ex: 2025-02-15T15:00)
+        - Rows that are invalid or take a taken slot are reported and skipped
+        """
+        attachments = getattr(ctx.message, 'attachments', None) or []
+        attachment = attachments[0] if attachments else None
+        fmt = format_of(attachment.filename) if attachment else None
+        if not fmt:
+            await ctx.send("Attach a .csv or .jsonl file with the columns queue, user_id, user_name, time.")
+            return
+
+        cortex = self.cortex.for_guild(ctx.guild)
+        all_prefs = await cortex.get_all_preferences()
+        now_hour = to_epoch_hour(datetime.now(pytz.UTC))
+        queues, errors, imported = {}, [], 0
+
+        # rows are added to the working models as they are read, so later rows see earlier ones
+        for line, row in read_rows(await attachment.read(), fmt):
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                queue_name = str(row.get("queue") or "").strip().lower()
+                if queue_name not in QUEUES:
+                    raise RowError(line, f"unknown queue {queue_name or '(empty)'}")
+                if queue_name not in queues:
+                    queues[queue_name] = await self.get_queue(cortex, queue_name)
+                entry = self.import_entry(queues[queue_name], row, line, now_hour, all_prefs)
+            except RowError as e:
+                errors.append(e)
                 continue
 
-            queue = queues[queue_name]
-            # Filter entries that are older than 2 hours
-            current_entries = [
-                entry for entry in queue['entries']
-                if datetime.fromisoformat(entry["time"]).replace(tzinfo=pytz.UTC) <= two_hours_ago
-            ]
+            queues[queue_name].add(entry)
+            imported += 1
+
+        if imported:
+            for queue_name, queue in queues.items():
+                await self.store_queue(cortex, queue_name, queue)
+            await cortex.remember(self.memory)
+        logger.info(f"Imported {imported} entries from {attachment.filename}, skipped {len(errors)}")
+
+        message = f"Imported {imported} entries, skipped {len(errors)} rows."
+        if errors:
+            message += f"\n```\n{summarize_errors(errors)}\n```"
+        await ctx.send(message)
+
+    @staticmethod
+    def import_entry(queue: QueueModel, row: dict, line: int, now_hour: int, all_prefs) -> QueueEntry:
+        """The entry of an imported row, RowError if the row cannot be added to the queue"""
+        user_id = str(row.get("user_id") or "").strip()
+        if not user_id:
+            raise RowError(line, "missing user_id")
+
+        try:
+            epoch = to_epoch(parse_time(row.get("time") or ""))
+        except ValueError:
+            raise RowError(line, f"invalid time {row.get('time')!r}, use 2025-02-15T15:00")
+
+        if epoch % HOUR_S:
+            raise RowError(line, "time must be on the hour")
+        if epoch // HOUR_S < now_hour:
+            raise RowError(line, "time is in the past")
+        if epoch // HOUR_S in queue.slots:
+            raise RowError(line, "time slot is already taken")
+        if queue.has_entry_within(user_id, epoch):
+            raise RowError(line, "user already has an entry in this queue within 24 hours")
+
+        alias = str(row.get("user_name") or "").strip() or get_alias_by_id(user_id, all_prefs) or user_id
+        return QueueEntry(epoch, user_id, alias)
+
+    @commands.command(name="queue.export", aliases=['q.export'])
+    @has_required_permissions()
+    async def queue_export(self, ctx, fmt: str = commands.parameter(description="- csv or jsonl", default="csv")):
+        """Download the entries of every queue as a file queue.import reads."""
+        fmt = fmt.lower() if isinstance(fmt, str) else "csv"
+        if fmt not in FORMATS:
+            await ctx.send(f"Invalid format. Choose from {', '.join(FORMATS)}.")
+            return
+
+        cortex = self.cortex.for_guild(ctx.guild)
+        queues = {queue_name: await self.get_queue(cortex, queue_name) for queue_name in QUEUES}
+        count = sum(len(queue.entries) for queue in queues.values())
+        await ctx.send(f"Exported {count} entries.",
+                       file=discord.File(io.BytesIO(write_rows(queues, fmt)), filename=f"title_queues.{fmt}"))
+
+    async def describe_events(self, cortex: Cortex) -> str:
+        """Summary of the upcoming title slots for the shared events view"""
+        return format_embed_fields(await self.build_list_embed(cortex, QUEUES))
+
+    async def build_list_embed(self, cortex: Cortex, queue_names) -> discord.Embed:
+        """
+        The embed listing the upcoming entries of the named queues.
+        Fields are rendered once per queue version, preferences version and hour
+        """
+        queue_names = tuple(name.lower() for name in queue_names if name.lower() in QUEUES)
+        hour = to_epoch_hour(datetime.now(pytz.UTC))
+
+        # versions are checked without loading anything, the memories are only read to render a miss
+        fields = self._list_cache.get((cortex.namespace, queue_names, cortex.get_version(self.memory),
+                                       cortex.get_version(Memory.PREFERENCES), hour))
+        if fields is None:
+            # cached under the versions rendered, loading the memories may have given them new ones
+            queues = await cortex.get_snapshot(self.memory)
+            all_prefs = await cortex.get_snapshot(Memory.PREFERENCES)
+            fields = await self.render_list_fields(cortex, queue_names, hour, queues, all_prefs.data)
+            self._list_cache.put((cortex.namespace, queue_names, queues.version, all_prefs.version, hour), fields)
+
+        embed = discord.Embed(title="👑 --= IMPERIAL TITLES =-- 👑", color=discord.Color.dark_gold())
+        for name, value in fields:
+            embed.add_field(name=name, value=value, inline=False)
+
+        if not embed.fields:
+            embed.description = "No entries in the queues."
+        return embed
+
+    async def render_list_fields(self, cortex: Cortex, queue_names: tuple, hour: int,
+                                 queues: Snapshot = None, all_prefs=None) -> tuple:
+        """
+        (name, value) of every list field, from the given snapshots of the queues and preferences or
+        the current ones. Entries are shown until two hours after their slot
+        """
+        fields = [("", "")]
+
+        all_prefs = all_prefs if all_prefs is not None else await cortex.get_all_preferences()
+        two_hours_ago = (hour - 2) * 3600
+
+        for queue_name in queue_names:
+            queue = await self.get_queue(cortex, queue_name, queues)
+            # Filter entries that are older than 2 hours, first is the index of the first one shown in the queue
+            first = bisect_left(queue.entries, two_hours_ago, key=attrgetter('epoch'))
+            current_entries = queue.entries[first:]
 
             if len(current_entries) == 0:
                 continue # skip empty queue
 
             # Display Queue name
-            embed.add_field(name=QUEUES[queue_name], value="", inline=False)
+            fields.append((QUEUES[queue_name], ""))
 
             # Display queue entries with UTC and Local time
             for i, entry in enumerate(current_entries):
 
                 logger.info(f"{queue_name} entry: {entry}")
-                entry_id = entry['user_id']
+                entry_id = entry.user_id
                 entry_alias = get_alias_by_id(entry_id, all_prefs)
 
                 # message details
-                emoji = EMOJIS["past"] if i < queue["cursor"] \
-                    else (EMOJIS["current"] if i == queue["cursor"] else EMOJIS["waiting"])
+                emoji = EMOJIS["past"] if first + i < queue.cursor \
+                    else (EMOJIS["current"] if first + i == queue.cursor else EMOJIS["waiting"])
 
                 entry_tz =  pytz.timezone(get_timezone_by_id(entry_id, all_prefs))
-                dt = datetime.fromisoformat(entry["time"])
+                dt = entry.time
 
                 # display timezone if not UTC
                 description = f"{dt.astimezone(entry_tz).strftime('%m-%d %H:%M')} {entry_tz}" \
                     if entry_tz.zone != "UTC" else ""
 
-                embed.add_field(name=f'{emoji}  {i+1}. {entry_alias} ({dt.astimezone(pytz.UTC).strftime("%m-%d %H:%M")})',
-                                value=description,
-                                inline=False)
+                fields.append((f'{emoji}  {i+1}. {entry_alias} ({dt.astimezone(pytz.UTC).strftime("%m-%d %H:%M")})',
+                               description))
 
             # add spacing between queues
-            embed.add_field(name="", value="", inline=False)
-
-        if not embed.fields:
-            embed.description = "No entries in the queues."
+            fields.append(("", ""))
 
-        await ctx.send(embed=embed)
-        await self.cortex.record_event(self.memory.type, format_embed_fields(embed))
+        return tuple(fields)
 
 
 async def setup(bot):
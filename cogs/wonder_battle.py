@@ -1,18 +1,14 @@
-from datetime import datetime
-
 from discord.ext import commands
 
-from cogs.battle.registered_battle import RegisteredBattle, DATE_DISPLAY_FORMAT, PRIMARY_ICON
+from cogs.battle.registered_battle import RegisteredBattle, PRIMARY_ICON
 from core.ganglia import Memory
 from utils.logger import init_logger
 
-BATTLE_NAME = "Wonder Contest"
-
 logger = init_logger('WonderContest')
 
 class WonderBattle(RegisteredBattle):
     def __init__(self, bot):
-        super().__init__(BATTLE_NAME, Memory.WONDER_BATTLE, bot)
+        super().__init__(Memory.WONDER_BATTLE, bot)
 
     @commands.command(name="wonder.add", aliases=['wonder'])
     async def add(self, ctx,
@@ -46,13 +42,25 @@ class WonderBattle(RegisteredBattle):
         await self.list_registration(
             ctx,
             options,
-            lambda prefs, entry, user_datetime: self._format_member(prefs, entry, user_datetime))
+            lambda prefs, entry, local_time: self._format_member(prefs, entry, local_time))
+
+    @commands.command(name="wonder.mine", aliases=['wonder.me'])
+    async def mine(self, ctx):
+        """List the slots you are registered for."""
+        await self.list_mine(
+            ctx,
+            lambda prefs, entry, local_time: self._format_member(prefs, entry, local_time))
+
+    @commands.command(name="wonder.history", aliases=['wonder.hist'])
+    async def history(self, ctx, weeks: int = commands.parameter(description="number of past weeks", default=4)):
+        """List the slots you were registered for in the past weeks."""
+        await self.list_history(ctx, weeks)
 
     @staticmethod
-    def _format_member(prefs: dict, entry: dict, user_datetime: datetime):
+    def _format_member(prefs: dict, entry: dict, local_time: str):
         is_primary = entry.get('context', {}).get('primary', False)
         icon = PRIMARY_ICON["primary"] if is_primary else PRIMARY_ICON["secondary"]
-        return f'{icon} {prefs.get("alias", "Unknown")} ({user_datetime.strftime(DATE_DISPLAY_FORMAT)})'
+        return f'{icon} {prefs.get("alias", "Unknown")} ({local_time})'
 
 
 # Add the cog to the bot
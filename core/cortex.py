@@ -1,15 +1,111 @@
 import asyncio
+import os
+import time
 
-from core.ganglia import GangliaInterface, Memory
+from core.ganglia import GangliaInterface, Memory, MEMORY_IDLE_UNLOAD_S
 from utils.logger import init_logger
 
+# Writes remembered within this window are coalesced into a single flush, 0 flushes immediately
+FLUSH_INTERVAL_MS = int(os.getenv('WOLFIE_FLUSH_INTERVAL_MS', 250))
+
+# Give every guild its own memories in data/guilds/<guild id>/. Off, all guilds share the memories in data/
+GUILD_NAMESPACES = os.getenv('WOLFIE_GUILD_NAMESPACES', 'false').lower() == 'true'
+
+# With guild namespaces, this guild keeps using the memories in data/ (e.g. the guild the bot was set up for)
+PRIMARY_GUILD_ID = os.getenv('WOLFIE_PRIMARY_GUILD_ID')
+
 logger = init_logger('Cortex')
 
 
 class Cortex(GangliaInterface):
-    def __init__(self):
-        super().__init__()
-        self._lock = asyncio.Lock()
+    def __init__(self, flush_interval_ms: int = FLUSH_INTERVAL_MS, memory_idle_unload_s: int = MEMORY_IDLE_UNLOAD_S,
+                 guild_namespaces: bool = GUILD_NAMESPACES, primary_guild_id: str = PRIMARY_GUILD_ID,
+                 namespace: str = None):
+        super().__init__(memory_idle_unload_s, namespace)
+        self._flush_interval = flush_interval_ms / 1000
+        self._flush_task: asyncio.Task | None = None
+
+        # memory type -> async function(cortex) summarizing that memory for the shared events
+        self._event_views: dict = {}
+
+        # guild namespaces: guild id -> cortex of the guild, created on first use and dropped when idle
+        self._guild_namespaces = guild_namespaces
+        self._primary_guild_id = str(primary_guild_id) if primary_guild_id else None
+        self._guilds: dict[str, Cortex] = {}
+        self._init_data: dict = {}
+        self._parent: Cortex | None = None
+        self.last_access: float = time.monotonic()
+
+    def for_guild(self, guild) -> 'Cortex':
+        """
+        The cortex holding the memories of a guild, given the guild or its id.
+        This cortex without guild namespaces, outside of a guild (direct messages) and for the primary guild
+        """
+        if self._parent is not None:
+            return self._parent.for_guild(guild)
+
+        guild_id = getattr(guild, 'id', guild)
+        if not self._guild_namespaces or guild_id is None or str(guild_id) == self._primary_guild_id:
+            return self
+
+        namespace = str(guild_id)
+        if not namespace.isdigit():
+            raise ValueError(f'Invalid guild id {guild_id!r}')
+
+        cortex = self._guilds.get(namespace)
+        if cortex is None:
+            cortex = self._guilds[namespace] = self._spawn(namespace)
+            logger.info(f"opened memories of guild {namespace}")
+        cortex.last_access = time.monotonic()
+        return cortex
+
+    def _spawn(self, namespace: str) -> 'Cortex':
+        """A guild cortex sharing the settings, initial data and event views of this one"""
+        cortex = Cortex(int(self._flush_interval * 1000), self._idle_unload_s, namespace=namespace)
+        cortex._parent = self
+        cortex._event_views = self._event_views
+        for memory_type, init_data in self._init_data.items():
+            cortex._memory[memory_type].initialize(init_data)
+        return cortex
+
+    def guild_cortices(self) -> list:
+        """This cortex and every guild cortex currently open"""
+        return [self, *self._guilds.values()]
+
+    def initialize_memory(self, mem: Memory, init_data: dict):
+        super().initialize_memory(mem, init_data)
+        self._init_data[mem.type] = init_data
+        for cortex in self._guilds.values():
+            cortex.initialize_memory(mem, init_data)
+
+    def lock_stats(self) -> dict:
+        """Lock contention counters, by lock name. Guild locks are prefixed with the guild id"""
+        stats = dict(super().lock_stats())
+        for namespace, cortex in self._guilds.items():
+            stats.update({f'{namespace}/{name}': lock for name, lock in cortex.lock_stats().items()})
+        return stats
+
+    def unload_idle(self, max_idle_s: float) -> list:
+        """Unload idle memories of this cortex and its guilds, guilds with nothing loaded are closed"""
+        unloaded = super().unload_idle(max_idle_s)
+        now = time.monotonic()
+        for namespace, cortex in list(self._guilds.items()):
+            unloaded += [f'{namespace}/{memory_type}' for memory_type in cortex.unload_idle(max_idle_s)]
+            if cortex.is_idle and not cortex._flush_pending and now - cortex.last_access > max_idle_s:
+                del self._guilds[namespace]
+                logger.info(f"closed idle guild {namespace}")
+        return unloaded
+
+    def _start_idle_sweep(self):
+        # a single sweep covers every guild
+        if self._parent is not None:
+            self._parent._start_idle_sweep()
+        else:
+            super()._start_idle_sweep()
+
+    @property
+    def _flush_pending(self) -> bool:
+        return self._flush_task is not None and not self._flush_task.done()
 
     async def get_user_details(self, user_id):
         user_details = {}
@@ -18,15 +114,59 @@ class Cortex(GangliaInterface):
             user_details[memory_name] = await memory_class.get(user_id)
         return user_details
 
-    async def record_event(self, key, event_details: dict):
-        await self.update_memory(Memory.SHARED_EVENTS, key, event_details)
-        await self.remember(Memory.SHARED_EVENTS)
+    def register_event_view(self, memory: Memory, view):
+        """Register the async function summarizing a memory for get_shared_events, it is given the cortex to read"""
+        self._event_views[memory.type] = view
+
+    async def get_shared_events(self) -> dict:
+        """Summaries of the alliance events, rendered from their memories when asked for"""
+        return {name: await view(self) for name, view in self._event_views.items()}
 
     async def remember(self, memory: Memory = None):
-        for memory_name, memory_class in self._memory.items():
-            if memory_class.is_modified or memory_name == memory.type:
-                logger.info(f"remembering: {memory_name}")
-                await memory_class.save()
+        """
+        Schedule a flush of every modified memory.
+        Calls made before the scheduled flush runs are coalesced into it.
+        Use flush() when the data has to be on disk before continuing.
+        """
+        if self._flush_interval <= 0:
+            await self.flush()
+            return
+
+        if self._flush_task is None or self._flush_task.done():
+            logger.debug(f"scheduling flush in {self._flush_interval}s ({memory.type if memory else 'all'})")
+            self._flush_task = asyncio.create_task(self._scheduled_flush())
+
+    async def _scheduled_flush(self):
+        await asyncio.sleep(self._flush_interval)
+
+        # changes remembered while flushing schedule the next flush
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"scheduled flush failed: {e}")
+
+    async def flush(self):
+        """Save every memory changed since its last save, including the memories of the guilds"""
+        for memory in Memory:
+            memory_class = self._memory[memory.type]
+            if memory_class.is_modified:
+                logger.info(f"remembering: {memory.type} (generation {memory_class.generation})")
+                await self.save_memory(memory)
+
+        for cortex in list(self._guilds.values()):
+            await cortex.flush()
+
+    async def shutdown(self):
+        """Cancel the scheduled flushes and flush now"""
+        self.stop_idle_sweep()
+        for cortex in list(self._guilds.values()):
+            await cortex.shutdown()
+
+        if self._flush_pending:
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
 
     async def forget(self, memory: Memory):
         await self._memory[memory.type].forget()
@@ -14,127 +14,339 @@ Key Components:
     Ganglia:
         Core class handling direct memory access and persistence
         - Manages individual cog data storage and retrieval
-        - Handles data persistence to JSON files
+        - Tracks changed keys and hands them to its Hippocampus store for persistence
         - Provides atomic operations for data access
+        - Publishes versioned, read-only snapshots for readers
+        - Loads its data on first access and can be unloaded again when idle
 
     GangliaInterface:
         Interface class providing controlled access to memory storage
         - Mediates access to preferences, queues, and battle data
         - Implements thread-safe operations through async locks
+        - Optionally scoped to a namespace (a guild) with its own memory files
+
+    LockManager:
+        Hands out the async locks used by the GangliaInterface
+        - One lock per memory, so a slow save only blocks its own memory
+        - Per-user memories are striped by key, users do not wait on each other
+        - Counts how often and how long operations wait on each lock
 
 Responsibilities:
     - Direct cog data access and updates
-    - Data persistence management
+    - Data persistence management (storage engines live in the Hippocampus module)
 """
 
 import asyncio
-import json
-import pathlib
+import copy
+import itertools
+import os
+import time
+import zlib
 from abc import ABC
+from contextlib import asynccontextmanager
 from enum import Enum
-from io import TextIOWrapper
-from types import MappingProxyType
+from typing import NamedTuple
 
 from discord.ext.commands import Context
 
+from core.hippocampus import WOLFIE_STORAGE, open_store, run_io
+from utils.codec_utils import JsonCodec
+from utils.frozen_utils import FrozenDict, freeze
 from utils.logger import init_logger
+from utils.schema_utils import Schema
+
+
+# Namespaced memories live in this directory next to the default ones, see Memory.data_path
+GUILDS_DIR = 'guilds'
+
+
+# Memories stored differently unless WOLFIE_STORAGE_<TYPE> is set.
+# The battle history grows every week and is read a week at a time, each week is its own shard
+DEFAULT_STORAGES = {"battle_history": "sharded"}
 
 
-# Memory configurations
+# Memory configurations: (type, path, codec, shards). WOLFIE_CODEC overrides the codec of every memory.
+# WOLFIE_STORAGE_<TYPE> overrides the storage of a single memory, e.g. WOLFIE_STORAGE_INTERACTIONS=sharded.
+# With sharded storage, shards is the number of hash buckets keys are spread over, 0 for one file per key
 class Memory(Enum):
-    SHARED_EVENTS = ("shared_events", "data/shared_events.json")
-    INTERACTIONS = ("interactions", "data/interactions.json")
-    PREFERENCES = ("preferences", "data/user_preferences.json")
-    TITLE_QUEUES = ("title_queues", "data/title_queue.json")
-    DAWN_BATTLE = ("dawn_battle", "data/dawn_battle.json")
-    WONDER_BATTLE = ("wonder_battle", "data/wonder_battle.json")
-
-    def __init__(self, type_value: str, path: str):
+    INTERACTIONS = ("interactions", "data/interactions.json", "json", 64)
+    PREFERENCES = ("preferences", "data/user_preferences.json", "json", 64)
+    TITLE_QUEUES = ("title_queues", "data/title_queue.json", "json", 0)
+    TITLE_QUEUE_ARCHIVE = ("title_queue_archive", "data/title_queue_archive.json", "json", 0)
+    DAWN_BATTLE = ("dawn_battle", "data/dawn_battle.json", "json", 0)
+    WONDER_BATTLE = ("wonder_battle", "data/wonder_battle.json", "json", 0)
+    BATTLE_HISTORY = ("battle_history", "data/battle_history.json", "json", 0)
+
+    def __init__(self, type_value: str, path: str, codec: str, shards: int):
         self.type = type_value
         self.path = path
+        self.codec = os.getenv('WOLFIE_CODEC', codec)
+        self.storage = os.getenv(f'WOLFIE_STORAGE_{type_value.upper()}',
+                                 DEFAULT_STORAGES.get(type_value, WOLFIE_STORAGE))
+        self.shards = shards
+
+    @property
+    def schema(self) -> Schema:
+        return SCHEMAS[self]
+
+    def data_path(self, namespace: str = None) -> str:
+        """Path of the memory, a namespace (guild) keeps its memories in data/guilds/<namespace>/"""
+        if namespace is None:
+            return self.path
+        directory, filename = os.path.split(self.path)
+        return os.path.join(directory, GUILDS_DIR, namespace, filename)
+
+    def options(self, namespace: str = None) -> dict:
+        """Arguments of the BasalGanglia for this memory"""
+        return dict(data_path=self.data_path(namespace), storage=self.storage, codec=self.codec,
+                    shards=self.shards, schema=self.schema)
+
+
+def _migrate_title_queues_v0(data: dict) -> dict:
+    """The oldest files stored a queue as its bare list of entries"""
+    return {name: queue if isinstance(queue, dict) else {"entries": queue, "cursor": 0}
+            for name, queue in data.items()}
+
+
+# Layout of each memory, validated in one pass whenever a file is loaded. When a layout
+# changes, bump its version and add a migration from the previous one (see utils.schema_utils)
+SCHEMAS = {
+    Memory.INTERACTIONS: Schema(1, {str: {"history": [dict]}}),
+    Memory.PREFERENCES: Schema(1, {str: dict}),
+    Memory.TITLE_QUEUES: Schema(
+        1, {str: {"entries": [{"user_id": str, "user_name": str, "time": str}], "cursor": int}},
+        migrations={0: _migrate_title_queues_v0}),
+    # past entries by month ("2025-02") and queue
+    Memory.TITLE_QUEUE_ARCHIVE: Schema(1, {str: {str: [{"user_id": str, "user_name": str, "time": str}]}}),
+    Memory.DAWN_BATTLE: Schema(1, {str: {str: {str: {"context": dict}}}}),
+    Memory.WONDER_BATTLE: Schema(1, {str: {str: {str: {"context": dict}}}}),
+    # past rosters by ISO week ("2025-W08") and battle type, slots holds the context of each user by day and time
+    Memory.BATTLE_HISTORY: Schema(1, {str: {str: {"dates": {str: str}, "slots": {str: {str: {str: dict}}}}}}),
+}
+
+# Per-user memories, key operations on them are locked per stripe instead of per memory
+STRIPED_MEMORIES = {Memory.PREFERENCES, Memory.INTERACTIONS}
+LOCK_STRIPES = int(os.getenv('WOLFIE_LOCK_STRIPES', 16))
+
+# Waits longer than this are logged as warnings
+LOCK_WAIT_WARNING_MS = 100
+
+# Saved memories not accessed for this long are dropped from memory, 0 keeps them loaded
+MEMORY_IDLE_UNLOAD_S = int(os.getenv('WOLFIE_MEMORY_IDLE_UNLOAD_S', 1800))
+
+# Generations are drawn from one counter for the whole process, a version never repeats even across
+# memories reopened after they were closed (e.g. a guild cortex closed when idle and opened again)
+GENERATIONS = itertools.count(1)
 
 logger = init_logger('Ganglia')
 
-def write_data_to_path(data: dict, path: str) -> None:
-    """ Writes the provided data to a JSON file at the specified path. """
 
-    pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+class Snapshot(NamedTuple):
+    """Read-only view of a memory. The version changes whenever the memory changes"""
+    version: int
+    data: FrozenDict
 
-    # Data size in KB
-    json_str = json.dumps(data, indent=2)
-    data_size_kb = len(json_str) / 1024
-    logger.debug(f'Saving {data_size_kb:.2f} KB to {path}')
-
-    with open(path, "w", encoding="utf-8") as file:
-        file: TextIOWrapper
-        file.write(json_str)
-
-
-def load_data_from_path(path: str) -> dict:
-    """
-    Loads data from a JSON file at the specified path.
-    Returns an empty dict if the file doesn't exist.
-    """
-    try:
-        with open(path, "r") as file:
-            data = json.load(file)
-            return data
-    except Exception as e:
-        logger.warn(f'{e}. Returning empty dict')
-        return {}
 
 class BasalGanglia(ABC):
     """Interface for all Ganglia class to supporting data persistence"""
 
-    def __init__(self, data_path: str):
+    def __init__(self, data_path: str, storage: str = WOLFIE_STORAGE, codec: str = JsonCodec.name, shards: int = 0,
+                 schema: Schema = None):
         self._data_path: str = data_path
+        self._store = open_store(data_path, storage, codec, shards, schema)
         self.init_data: dict = {}
-        self._data: dict = load_data_from_path(data_path)
-        self.is_modified: bool = False
+
+        # nothing is read until the memory is first accessed
+        self._loaded: bool = False
+        self._load_lock = asyncio.Lock()
+        self.last_access: float = 0
+
+        # keyed stores are read one key at a time, the others are loaded as a whole.
+        # _loaded_keys is None once everything is in memory
+        self._data: dict = {}
+        self._loaded_keys: set | None = set()
+
+        # every change takes the next generation, a save records the generation it covers
+        self.generation: int = 0
+        self.saved_generation: int = 0
+
+        # keys changed since the last save, None when the whole memory changed
+        self._changed_keys: set | None = set()
+
+        # frozen copies of unchanged keys are reused by the next snapshot
+        self._frozen: dict = {}
+        self._snapshot: Snapshot | None = None
+
+    @property
+    def is_modified(self) -> bool:
+        return self.generation != self.saved_generation
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
 
     def initialize(self, init_data: dict):
-        """Initialize the Ganglia instance only if data is empty"""
+        """Initialize the Ganglia instance only if data is empty. Applied on load if not loaded yet"""
 
         self.init_data = init_data
-        if not self._data:
-            self._data = init_data
-            self.is_modified = True
+        if self._loaded and not self._data and (self._loaded_keys is None or self._store.is_empty()):
+            self._reset()
+
+    def _reset(self):
+        self._data = copy.deepcopy(self.init_data)
+        self._loaded_keys = None
+        self._loaded = True
+        self.touch()
+
+    async def load(self):
+        """Load the memory on first access. Concurrent first accesses wait for the same load"""
+        self.last_access = time.monotonic()
+        if self._loaded:
+            return
+
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            if self._store.keyed:
+                self._data, self._loaded_keys = {}, set()
+                is_empty = await run_io(self._store.is_empty)
+            else:
+                self._data, self._loaded_keys = await self._store.reload(), None
+                is_empty = not self._data
+
+            self._changed_keys = set()
+            self._frozen.clear()
+            self.generation = next(GENERATIONS)
+            self.saved_generation = self.generation
+            self._loaded = True
+            logger.info(f'Loaded {self._data_path}')
+
+            if is_empty and self.init_data:
+                self._reset()
+
+    def unload(self) -> bool:
+        """Drop the data from memory if everything is saved. Returns True if unloaded"""
+        if not self._loaded or self.is_modified or self._load_lock.locked():
+            return False
+
+        self._data, self._loaded_keys = {}, set()
+        self._frozen.clear()
+        self._snapshot = None
+        self._loaded = False
+        logger.info(f'Unloaded {self._data_path}')
+        return True
+
+    def touch(self, key: str = None):
+        """Mark a key as changed since the last save. Without a key, the whole memory is marked"""
+        self.generation = next(GENERATIONS)
+        if key is None:
+            self._changed_keys = None
+            self._frozen.clear()
+            return
+
+        self._frozen.pop(str(key), None)
+        if self._changed_keys is not None:
+            self._changed_keys.add(str(key))
+
+    async def _load_key(self, key: str):
+        """Bring a single key into memory from a keyed store"""
+        if self._loaded_keys is None or key in self._loaded_keys or key in self._data:
+            return
+
+        value = await self._store.fetch(key)
+        self._loaded_keys.add(key)
+        if value is not None:
+            # the key may have been set while fetching
+            self._data.setdefault(key, value)
+
+    async def _load_all(self):
+        """Bring every key into memory from a keyed store"""
+        if self._loaded_keys is None:
+            return
+
+        async for chunk in self._store.stream():
+            for key, value in chunk.items():
+                # keys set or fetched meanwhile are newer than the stored ones
+                self._data.setdefault(key, value)
+        self._loaded_keys = None
 
     async def get(self, key: str, **kwargs):
         """Retrieve a specific entry from memory given the context"""
+        await self.load()
+        await self._load_key(str(key))
         return self._data.get(str(key), {})
 
     async def get_all(self):
+        """Returns a read-only view of all memory, see snapshot()"""
+        return (await self.snapshot()).data
+
+    async def snapshot(self) -> Snapshot:
         """
-        Returns a read-only copy of all memory.
-        Uses MappingProxyType for a true read-only view of the dictionary.
+        Returns a versioned, deeply read-only snapshot of all memory.
+        Snapshots are shared until the memory changes, readers can keep one without copying.
+        Only keys changed since the previous snapshot are copied into the next one.
         """
-        return dict(MappingProxyType(self._data))
+        await self.load()
+        await self._load_all()
+        if self._snapshot and self._snapshot.version == self.generation:
+            return self._snapshot
+
+        for key, value in self._data.items():
+            if key not in self._frozen:
+                self._frozen[key] = freeze(value)
+        for key in self._frozen.keys() - self._data.keys():
+            del self._frozen[key]
+
+        self._snapshot = Snapshot(self.generation, FrozenDict(self._frozen))
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.generation
 
     async def update(self, key: str, value: dict):
-        """Update data entry"""
+        """Update data entry. The change is persisted by the next save"""
+        await self.load()
         self._data[str(key)] = value
-        await self.save()
+        self.touch(key)
 
     async def save(self):
         """Save data to persistent storage"""
+        if not self._loaded:
+            return
         logger.debug(f'Saving data to {self._data_path}')
-        write_data_to_path(self._data, self._data_path)
+        generation = self.generation
+        changed_keys, self._changed_keys = self._changed_keys, set()
+        try:
+            await self._store.persist(self._data, changed_keys)
+        except Exception:
+            # keep the keys so the next save retries them
+            if changed_keys is None or self._changed_keys is None:
+                self._changed_keys = None
+            else:
+                self._changed_keys |= changed_keys
+            raise
+        self.saved_generation = max(self.saved_generation, generation)
 
     async def reload(self, path: str):
         """Reload data from persistent storage"""
-        self._data: dict = load_data_from_path(self._data_path)
+        self._loaded = False
+        await self.load()
 
     async def forget(self):
         """Reset to init data"""
-        self._data = self.init_data
+        self.last_access = time.monotonic()
+        self._reset()
 
 
 class PreferencesGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.PREFERENCES.path)
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.PREFERENCES.options(namespace))
 
     async def get(self, key: str, **kwargs):
+        await self.load()
+        await self._load_key(key)
         prefs = self._data.get(key, {})
         if not prefs and'ctx' in kwargs:
             logger.debug(f'create_default_preferences')
@@ -149,65 +361,163 @@ class PreferencesGanglia(BasalGanglia):
             'timezone': 'UTC'
         }
         self._data[str(ctx.author.id)] = prefs
+        self.touch(ctx.author.id)
         logger.debug(f'created default preferences for {ctx.author.id} = {prefs}')
-        await self.save()
         return prefs
 
 class QueueGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.TITLE_QUEUES.path)
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.TITLE_QUEUES.options(namespace))
+
+class QueueArchiveGanglia(BasalGanglia):
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.TITLE_QUEUE_ARCHIVE.options(namespace))
 
 class WonderBattleGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.WONDER_BATTLE.path)
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.WONDER_BATTLE.options(namespace))
 
 class DawnBattleGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.DAWN_BATTLE.path)
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.DAWN_BATTLE.options(namespace))
+
+class BattleHistoryGanglia(BasalGanglia):
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.BATTLE_HISTORY.options(namespace))
 
 class InteractionsGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.INTERACTIONS.path)
+    def __init__(self, namespace: str = None):
+        super().__init__(**Memory.INTERACTIONS.options(namespace))
+
+class LockManager:
+    """
+    Async locks keyed by memory type, striped by key for STRIPED_MEMORIES.
+
+    Key operations (get, update) on a striped memory take the lock of the key's stripe,
+    everything else takes the memory lock.
+    """
+
+    def __init__(self, stripes: int = LOCK_STRIPES):
+        self._stripes = stripes
+        self._locks: dict[str, asyncio.Lock] = {}
+
+        # lock name -> {acquired, contended, wait_ms, max_wait_ms}
+        self.stats: dict[str, dict] = {}
+
+    def lock_name(self, mem: Memory, key: str = None) -> str:
+        if key is None or self._stripes <= 0 or mem not in STRIPED_MEMORIES:
+            return mem.type
+        return f'{mem.type}:{zlib.crc32(str(key).encode()) % self._stripes}'
+
+    @asynccontextmanager
+    async def acquire(self, mem: Memory, key: str = None):
+        name = self.lock_name(mem, key)
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        stats = self.stats.setdefault(name, {'acquired': 0, 'contended': 0, 'wait_ms': 0.0, 'max_wait_ms': 0.0})
+
+        if not lock.locked():
+            await lock.acquire()
+        else:
+            start = time.perf_counter()
+            await lock.acquire()
+            wait_ms = (time.perf_counter() - start) * 1000
+            stats['contended'] += 1
+            stats['wait_ms'] += wait_ms
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], wait_ms)
+            if wait_ms > LOCK_WAIT_WARNING_MS:
+                logger.warning(f'waited {wait_ms:.1f} ms for lock {name}')
+
+        stats['acquired'] += 1
+        try:
+            yield
+        finally:
+            lock.release()
 
-class SharedEventsGanglia(BasalGanglia):
-    def __init__(self):
-        super().__init__(Memory.SHARED_EVENTS.path)
 
 class GangliaInterface:
-    def __init__(self):
-        self._lock = asyncio.Lock()
+    def __init__(self, memory_idle_unload_s: int = MEMORY_IDLE_UNLOAD_S, namespace: str = None):
+        self._locks = LockManager()
+        self._idle_unload_s = memory_idle_unload_s
+        self._sweep_task: asyncio.Task | None = None
 
+        # None for the default memories in data/, otherwise the guild the memories belong to
+        self.namespace = namespace
         self._memory = {
-            Memory.PREFERENCES.type: PreferencesGanglia(),
-            Memory.TITLE_QUEUES.type: QueueGanglia(),
-            Memory.WONDER_BATTLE.type: WonderBattleGanglia(),
-            Memory.DAWN_BATTLE.type: DawnBattleGanglia(),
-            Memory.INTERACTIONS.type: InteractionsGanglia(),
-            Memory.SHARED_EVENTS.type: SharedEventsGanglia()
+            Memory.PREFERENCES.type: PreferencesGanglia(namespace),
+            Memory.TITLE_QUEUES.type: QueueGanglia(namespace),
+            Memory.TITLE_QUEUE_ARCHIVE.type: QueueArchiveGanglia(namespace),
+            Memory.WONDER_BATTLE.type: WonderBattleGanglia(namespace),
+            Memory.DAWN_BATTLE.type: DawnBattleGanglia(namespace),
+            Memory.BATTLE_HISTORY.type: BattleHistoryGanglia(namespace),
+            Memory.INTERACTIONS.type: InteractionsGanglia(namespace)
         }
 
     async def get_preferences(self, ctx: Context):
         return await self.get_memory(Memory.PREFERENCES, str(ctx.author.id), ctx=ctx)
 
     async def get_all_preferences(self):
-        return await self.get_memory(Memory.PREFERENCES)
+        return (await self.get_snapshot(Memory.PREFERENCES)).data
 
     def initialize_memory(self, mem: Memory, init_data: dict):
         self._memory[mem.type].initialize(init_data)
 
+    @property
+    def is_idle(self) -> bool:
+        """True when nothing is loaded or waiting to be saved"""
+        return not any(ganglia.is_loaded or ganglia.is_modified for ganglia in self._memory.values())
+
     async def get_memory(self, mem: Memory, key: str = None, **kwargs):
+        """Returns the live entry for key to update in place, or a read-only snapshot of all entries"""
         return await self._execute(mem, 'get', key, **kwargs) if key \
             else await self._execute(mem, 'get_all')
 
+    async def get_snapshot(self, mem: Memory) -> Snapshot:
+        """Returns the versioned read-only snapshot of a memory, no lock is taken"""
+        self._start_idle_sweep()
+        return await self._memory[mem.type].snapshot()
+
+    def get_version(self, mem: Memory) -> int:
+        """Cheap check whether a memory changed since a previous snapshot"""
+        return self._memory[mem.type].version
+
     async def update_memory(self, mem: Memory, key: str, value :dict) -> dict:
         await self._execute(mem, 'update', key, value)
-        self._memory[mem.type].is_modified = True
 
     async def save_memory(self, mem: Memory):
         return await self._execute(mem, 'save')
 
+    def lock_stats(self) -> dict:
+        """Lock contention counters, by lock name"""
+        return self._locks.stats
+
+    def unload_idle(self, max_idle_s: float) -> list:
+        """Unload saved memories not accessed for max_idle_s. Returns the unloaded memory types"""
+        now = time.monotonic()
+        return [memory_type for memory_type, ganglia in self._memory.items()
+                if ganglia.is_loaded and now - ganglia.last_access > max_idle_s and ganglia.unload()]
+
+    def _start_idle_sweep(self):
+        if self._idle_unload_s > 0 and (self._sweep_task is None or self._sweep_task.done()):
+            self._sweep_task = asyncio.create_task(self._sweep_idle())
+
+    def stop_idle_sweep(self):
+        if self._sweep_task and not self._sweep_task.done():
+            self._sweep_task.cancel()
+        self._sweep_task = None
+
+    async def _sweep_idle(self):
+        while True:
+            await asyncio.sleep(self._idle_unload_s / 4)
+            unloaded = self.unload_idle(self._idle_unload_s)
+            if unloaded:
+                logger.info(f"unloaded idle memories: {unloaded}")
+
     async def _execute(self, mem: Memory, operation: str, *args, **kwargs):
-        async with self._lock:
+        self._start_idle_sweep()
+
+        # get and update take the key as their first argument
+        key = args[0] if operation in ('get', 'update') else None
+        async with self._locks.acquire(mem, key):
             storage = self._memory[mem.type]
             method = getattr(storage, operation)
             logger.info(f"{operation} {mem.type} with args: {args}")
@@ -0,0 +1,575 @@
+"""
+Hippocampus Module - Memory Consolidation
+
+This module implements the storage engines behind the Ganglia memories.
+It decides how a memory is laid out on disk and how short-term changes
+are consolidated into long-term storage.
+
+Architecture:
+    The Hippocampus sits below the Ganglia. A Ganglia keeps its working
+    memory as a dict and hands it to its store whenever it is saved,
+    together with the keys that changed since the last save.
+
+Key Components:
+    SnapshotStore:
+        Persists the whole memory as a single document (default)
+
+    JournalStore:
+        Write-ahead log storage
+        - Appends one small record per changed key to a per-memory log
+        - Rebuilds the memory from snapshot + log at startup
+        - Consolidates the log into a new snapshot in the background
+          once the log grows past a size threshold
+
+    SqliteStore:
+        One row per key in a per-memory SQLite database (WAL mode)
+        - Keyed: the Ganglia reads single keys on demand instead of loading everything
+        - A save upserts only the changed rows
+        - Imports the existing JSON file the first time the database is created
+
+    ShardedStore:
+        One file per top-level key, or per hash bucket of keys, in a per-memory directory
+        - Keyed: single keys are read from their own shard
+        - A save rewrites only the shards holding changed keys
+        - Loading everything streams the shards one at a time
+        - Splits the existing JSON file into shards the first time it is used
+
+    IO_EXECUTOR:
+        Dedicated thread pool for disk I/O
+        - Memory is serialized on the event loop, so the payload is a consistent copy
+        - Files are written by a worker to a temp file and swapped in with os.replace,
+          a crash mid-write never leaves a truncated file behind
+
+Storage is selected with the WOLFIE_STORAGE environment variable, or per memory
+with WOLFIE_STORAGE_<TYPE>. Snapshot files
+are written with the codec configured for their memory (see utils.codec_utils),
+the codec is detected from the file header when loading.
+
+Loading checks the payload checksum, migrates the data to the current schema of
+its memory and validates it (see utils.schema_utils). A file failing any of these
+is quarantined as <path>.corrupt-<time> and the newest good backup is restored;
+every snapshot write keeps the previous file as <path>.bak.1 .. .bak.N.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import pathlib
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.codec_utils import JsonCodec, encode, decode_with_header
+from utils.logger import init_logger
+from utils.schema_utils import Schema
+
+WOLFIE_STORAGE = os.getenv('WOLFIE_STORAGE', 'snapshot')
+JOURNAL_COMPACT_BYTES = int(os.getenv('WOLFIE_JOURNAL_COMPACT_KB', 256)) * 1024
+IO_WORKERS = int(os.getenv('WOLFIE_IO_WORKERS', 2))
+SNAPSHOT_BACKUPS = int(os.getenv('WOLFIE_SNAPSHOT_BACKUPS', 2))
+
+# Keys that can be used as shard file names as they are, others are named by their crc32
+SAFE_SHARD_NAME = re.compile(r'[A-Za-z0-9_-]{1,64}')
+SHARD_SUFFIX = '.shard'
+
+logger = init_logger('Hippocampus')
+
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='ganglia-io')
+
+
+async def run_io(func, *args):
+    """Run a blocking disk operation on the I/O executor"""
+    return await asyncio.get_running_loop().run_in_executor(IO_EXECUTOR, func, *args)
+
+
+def write_bytes_to_path(payload: bytes, path: str, backups: int = 0) -> None:
+    """
+    Atomically replaces the file at path with payload, keeping up to backups previous versions.
+    Blocking, call through run_io from async code
+    """
+
+    parent = pathlib.Path(path).parent
+    parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=f'{pathlib.Path(path).name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        _rotate_backups(path, backups)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def backup_paths(path: str, backups: int = SNAPSHOT_BACKUPS) -> list:
+    """Backups of path, newest first"""
+    return [f'{path}.bak.{n}' for n in range(1, backups + 1)]
+
+
+def _rotate_backups(path: str, backups: int):
+    if backups <= 0 or not os.path.exists(path):
+        return
+
+    paths = backup_paths(path, backups)
+    for older, newer in reversed(list(zip(paths, paths[1:]))):
+        if os.path.exists(older):
+            os.replace(older, newer)
+    if os.path.exists(paths[0]):
+        os.remove(paths[0])
+
+    # the current file becomes the newest backup without copying it, the new file is swapped in next
+    try:
+        os.link(path, paths[0])
+    except OSError:
+        shutil.copyfile(path, paths[0])
+
+
+def remove_path(path: str) -> None:
+    """Remove a file along with its backups"""
+    for file_path in (path, *backup_paths(path)):
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def write_data_to_path(data: dict, path: str, codec: str = JsonCodec.name,
+                       schema: int = None, backups: int = 0) -> None:
+    """ Writes the provided data to a file at the specified path, encoded with codec. """
+
+    # Data size in KB
+    payload = encode(data, codec, schema)
+    data_size_kb = len(payload) / 1024
+    logger.debug(f'Saving {data_size_kb:.2f} KB to {path}')
+
+    write_bytes_to_path(payload, path, backups)
+
+
+def decode_data(raw: bytes, schema: Schema = None) -> dict:
+    """Decode file content and bring it to the current schema. Raises ValueError if it is corrupt or invalid"""
+    fields, data = decode_with_header(raw)
+    if schema is not None:
+        data = schema.upgrade(data, int(fields.get('schema', 0)))
+    return data
+
+
+def quarantine_path(path: str) -> str:
+    """Move a corrupt file out of the way, it is kept for inspection"""
+    quarantined = f'{path}.corrupt-{time.strftime("%Y%m%d-%H%M%S")}'
+    os.replace(path, quarantined)
+    return quarantined
+
+
+def load_data_from_path(path: str, schema: Schema = None) -> dict:
+    """
+    Loads data from a file at the specified path, the codec is detected from its header.
+    Returns an empty dict if the file doesn't exist.
+
+    A corrupt or invalid file is quarantined and replaced by its newest good backup.
+    Returns an empty dict only if there is no good backup either.
+    """
+    if not os.path.exists(path):
+        logger.debug(f'{path} does not exist. Returning empty dict')
+        return {}
+
+    try:
+        with open(path, "rb") as file:
+            return decode_data(file.read(), schema)
+    except (ValueError, TypeError, EOFError) as e:
+        logger.error(f'Cannot load {path}: {e}. Quarantined as {quarantine_path(path)}')
+
+    for backup_path in backup_paths(path):
+        if not os.path.exists(backup_path):
+            continue
+        with open(backup_path, "rb") as file:
+            raw = file.read()
+        try:
+            # a torn or damaged backup fails its checksum before it is parsed
+            data = decode_data(raw, schema)
+        except (ValueError, TypeError, EOFError) as e:
+            logger.warning(f'Skipping backup {backup_path}: {e}')
+            continue
+
+        write_bytes_to_path(raw, path)
+        logger.warning(f'Restored {path} from {backup_path}')
+        return data
+
+    logger.error(f'No good backup of {path}. Returning empty dict')
+    return {}
+
+
+class SnapshotStore:
+    """Stores the whole memory as one document, rewritten on every save"""
+
+    # keyed stores can fetch a single key without loading the whole memory
+    keyed = False
+
+    def __init__(self, path: str, codec: str = JsonCodec.name, schema: Schema = None):
+        self.path = path
+        self.codec = codec
+        self.schema = schema
+
+        # writes of a store run one at a time, in the order they were serialized
+        self._io_lock = asyncio.Lock()
+
+    def encode(self, data: dict) -> bytes:
+        return encode(data, self.codec, self.schema.version if self.schema else None)
+
+    def load(self) -> dict:
+        return load_data_from_path(self.path, self.schema)
+
+    async def reload(self) -> dict:
+        async with self._io_lock:
+            return await run_io(self.load)
+
+    async def stream(self):
+        """Yields the stored memory in chunks of keys. Stores without chunks yield everything at once"""
+        yield await self.reload()
+
+    async def persist(self, data: dict, keys: set = None):
+        """Persist the memory. Keys that changed are ignored, the full snapshot is always written"""
+        payload = self.encode(data)
+        logger.debug(f'Saving {len(payload) / 1024:.2f} KB to {self.path}')
+        async with self._io_lock:
+            await run_io(write_bytes_to_path, payload, self.path, SNAPSHOT_BACKUPS)
+
+
+class JournalStore(SnapshotStore):
+    """
+    Stores the memory as a snapshot plus an append-only log of changed keys.
+
+    Each record is a single compact JSON line:
+        {"op": "set", "key": "sage", "value": {...}}
+        {"op": "del", "key": "sage"}
+
+    Compaction rotates the log to <path>.log.1 and writes a new snapshot.
+    Replaying the rotated log on top of the new snapshot is harmless since
+    every record carries the full value of its key.
+    """
+
+    def __init__(self, path: str, codec: str = JsonCodec.name, compact_bytes: int = JOURNAL_COMPACT_BYTES,
+                 schema: Schema = None):
+        super().__init__(path, codec, schema)
+        self.log_path = f'{path}.log'
+        self.rotated_log_path = f'{path}.log.1'
+        self.compact_bytes = compact_bytes
+        self._log_size = 0
+        self._compaction: asyncio.Task | None = None
+
+    def load(self) -> dict:
+        data = load_data_from_path(self.path, self.schema)
+        self._replay(data, self.rotated_log_path)
+        self._log_size = self._replay(data, self.log_path)
+        return data
+
+    @staticmethod
+    def _replay(data: dict, log_path: str) -> int:
+        """Apply the records of a log file to data. Returns the log size in bytes"""
+        if not os.path.exists(log_path):
+            return 0
+
+        count = 0
+        with open(log_path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # torn write from a crash, everything after it is unusable
+                    logger.warning(f'Ignoring incomplete record in {log_path} after {count} records')
+                    break
+
+                if record['op'] == 'set':
+                    data[record['key']] = record['value']
+                elif record['op'] == 'del':
+                    data.pop(record['key'], None)
+                count += 1
+
+        logger.debug(f'Replayed {count} records from {log_path}')
+        return os.path.getsize(log_path)
+
+    async def persist(self, data: dict, keys: set = None):
+        """Append a record for every changed key. Without keys a new snapshot is written"""
+        if keys is None:
+            await self.compact(data)
+            return
+
+        if not keys:
+            return
+
+        records = []
+        for key in keys:
+            record = {'op': 'set', 'key': key, 'value': data[key]} if key in data else {'op': 'del', 'key': key}
+            records.append(json.dumps(record, separators=(',', ':')) + '\n')
+        journal = ''.join(records)
+        self._log_size += len(journal)
+
+        async with self._io_lock:
+            await run_io(self._append, journal)
+        logger.debug(f'Appended {len(records)} records to {self.log_path} ({self._log_size} bytes)')
+
+        if self._log_size > self.compact_bytes and not self.is_compacting():
+            logger.info(f'{self.log_path} passed {self.compact_bytes} bytes, compacting')
+            self._compaction = asyncio.create_task(self._compact(data))
+
+    def is_compacting(self) -> bool:
+        return self._compaction is not None and not self._compaction.done()
+
+    async def compact(self, data: dict):
+        """Fold the log into a new snapshot"""
+        if self.is_compacting():
+            await self._compaction
+        self._compaction = asyncio.create_task(self._compact(data))
+        await self._compaction
+
+    async def _compact(self, data: dict):
+        # appends serialized after this point are queued behind the rotation and land in the new log
+        payload = self.encode(data)
+        self._log_size = 0
+
+        async with self._io_lock:
+            await run_io(self._write_snapshot, payload)
+        logger.info(f'Compacted {self.path}')
+
+    def _append(self, journal: str):
+        pathlib.Path(self.log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as file:
+            file.write(journal)
+            file.flush()
+
+    def _rotate_log(self):
+        if not os.path.exists(self.log_path):
+            return
+
+        if not os.path.exists(self.rotated_log_path):
+            os.replace(self.log_path, self.rotated_log_path)
+            return
+
+        # a previous compaction did not finish, keep its records until the new snapshot is written
+        with open(self.log_path, "r", encoding="utf-8") as log, \
+                open(self.rotated_log_path, "a", encoding="utf-8") as rotated:
+            rotated.write(log.read())
+        os.remove(self.log_path)
+
+    def _write_snapshot(self, payload: bytes):
+        self._rotate_log()
+        write_bytes_to_path(payload, self.path, SNAPSHOT_BACKUPS)
+        if os.path.exists(self.rotated_log_path):
+            os.remove(self.rotated_log_path)
+
+
+class SqliteStore(SnapshotStore):
+    """
+    Stores the memory in <path>.db with one row per top-level key.
+
+    Values are compact JSON. The database is opened in WAL mode, so a save is
+    a small transaction appended to the WAL rather than a rewrite of the file.
+    """
+
+    keyed = True
+
+    def __init__(self, path: str, codec: str = JsonCodec.name, schema: Schema = None):
+        super().__init__(path, codec, schema)
+        self.db_path = str(pathlib.Path(path).with_suffix('.db'))
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        """Connects on first use, so unused memories never open their database"""
+        if self._connection is None:
+            pathlib.Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            is_new = not os.path.exists(self.db_path)
+            self._connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS memory (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            if is_new:
+                self._migrate()
+        return self._connection
+
+    def _migrate(self):
+        """One-shot import of the JSON snapshot (and journal, if any) into a new database"""
+        data = JournalStore(self.path, schema=self.schema).load()
+        if data:
+            self._write([(key, json.dumps(value, separators=(',', ':'))) for key, value in data.items()])
+            logger.info(f'Migrated {len(data)} keys from {self.path} to {self.db_path}')
+
+    def load(self) -> dict:
+        return {key: json.loads(value) for key, value in self._db.execute('SELECT key, value FROM memory')}
+
+    def is_empty(self) -> bool:
+        return self._db.execute('SELECT 1 FROM memory LIMIT 1').fetchone() is None
+
+    async def fetch(self, key: str):
+        """Returns the value stored for key, None if there is none"""
+        async with self._io_lock:
+            return await run_io(self._fetch, key)
+
+    def _fetch(self, key: str):
+        row = self._db.execute('SELECT value FROM memory WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def persist(self, data: dict, keys: set = None):
+        """Upsert the changed keys, delete the removed ones. Without keys all rows are replaced"""
+        replace = keys is None
+        keys = data.keys() if replace else keys
+        if not keys and not replace:
+            return
+
+        rows = [(key, json.dumps(data[key], separators=(',', ':'))) for key in keys if key in data]
+        deletes = [key for key in keys if key not in data]
+        async with self._io_lock:
+            await run_io(self._write, rows, deletes, replace)
+        logger.debug(f'Saved {len(rows)} rows, deleted {len(deletes)} rows in {self.db_path}')
+
+    def _write(self, rows: list, deletes: list = (), replace: bool = False):
+        self._db.execute('BEGIN')
+        try:
+            if replace:
+                self._db.execute('DELETE FROM memory')
+            self._db.executemany(
+                'INSERT INTO memory (key, value) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET value = excluded.value', rows)
+            self._db.executemany('DELETE FROM memory WHERE key = ?', [(key,) for key in deletes])
+            self._db.execute('COMMIT')
+        except Exception:
+            self._db.execute('ROLLBACK')
+            raise
+
+
+class ShardedStore(SnapshotStore):
+    """
+    Stores the memory as shard files in a directory named after <path>, e.g. data/title_queue/
+
+    Without buckets every top-level key gets its own shard (sage.shard, d1.shard),
+    with buckets keys are spread over that many shards by crc32 of the key.
+    A shard holds a dict of its keys, encoded with the memory codec.
+    """
+
+    keyed = True
+
+    def __init__(self, path: str, codec: str = JsonCodec.name, buckets: int = 0, schema: Schema = None):
+        super().__init__(path, codec, schema)
+        self.shard_dir = str(pathlib.Path(path).with_suffix(''))
+        self.buckets = buckets
+        self._checked = False
+
+    def shard_path(self, key: str) -> str:
+        if self.buckets:
+            name = f'bucket-{zlib.crc32(key.encode()) % self.buckets:03d}'
+        elif SAFE_SHARD_NAME.fullmatch(key):
+            name = key
+        else:
+            name = f'key-{zlib.crc32(key.encode()):08x}'
+        return os.path.join(self.shard_dir, f'{name}{SHARD_SUFFIX}')
+
+    def _shard_paths(self) -> list:
+        self._migrate()
+        return sorted(str(path) for path in pathlib.Path(self.shard_dir).glob(f'*{SHARD_SUFFIX}'))
+
+    def _migrate(self):
+        """One-shot split of the JSON snapshot (and journal, if any) into shards, when the directory is new"""
+        if self._checked:
+            return
+        self._checked = True
+        if os.path.isdir(self.shard_dir):
+            return
+
+        os.makedirs(self.shard_dir)
+        data = JournalStore(self.path, schema=self.schema).load()
+        if data:
+            self._write(data, set(), replace=False)
+            logger.info(f'Migrated {len(data)} keys from {self.path} to {self.shard_dir}')
+
+    def _read_shard(self, shard_path: str) -> dict:
+        return load_data_from_path(shard_path, self.schema)
+
+    def load(self) -> dict:
+        data = {}
+        for shard_path in self._shard_paths():
+            data.update(self._read_shard(shard_path))
+        return data
+
+    async def stream(self):
+        """Yields one shard at a time, the event loop runs between shard reads"""
+        async with self._io_lock:
+            shard_paths = await run_io(self._shard_paths)
+        for shard_path in shard_paths:
+            async with self._io_lock:
+                shard = await run_io(self._read_shard, shard_path)
+            yield shard
+
+    def is_empty(self) -> bool:
+        return not self._shard_paths()
+
+    async def fetch(self, key: str):
+        """Returns the value stored for key, None if there is none"""
+        async with self._io_lock:
+            return await run_io(self._fetch, key)
+
+    def _fetch(self, key: str):
+        self._migrate()
+        return self._read_shard(self.shard_path(key)).get(key)
+
+    async def persist(self, data: dict, keys: set = None):
+        """Rewrite the shards of the changed keys. Without keys every shard is rewritten"""
+        replace = keys is None
+        keys = data.keys() if replace else keys
+        if not keys and not replace:
+            return
+
+        # copied on the loop, the worker merges them into shards that may hold keys not loaded here
+        changes = {key: copy.deepcopy(data[key]) for key in keys if key in data}
+        deletes = {key for key in keys if key not in data}
+        async with self._io_lock:
+            shards = await run_io(self._write, changes, deletes, replace)
+        logger.debug(f'Saved {len(changes)} keys, deleted {len(deletes)} keys in {shards} shards of {self.shard_dir}')
+
+    def _write(self, changes: dict, deletes: set, replace: bool) -> int:
+        self._migrate()
+        keys_by_shard = {}
+        for key in changes.keys() | deletes:
+            keys_by_shard.setdefault(self.shard_path(key), []).append(key)
+
+        if replace:
+            for shard_path in self._shard_paths():
+                if shard_path not in keys_by_shard:
+                    remove_path(shard_path)
+
+        for shard_path, keys in keys_by_shard.items():
+            shard = {} if replace else self._read_shard(shard_path)
+            for key in keys:
+                if key in changes:
+                    shard[key] = changes[key]
+                else:
+                    shard.pop(key, None)
+
+            if shard:
+                write_bytes_to_path(self.encode(shard), shard_path, SNAPSHOT_BACKUPS)
+            else:
+                remove_path(shard_path)
+        return len(keys_by_shard)
+
+
+STORES = {
+    'snapshot': SnapshotStore,
+    'journal': JournalStore,
+    'sqlite': SqliteStore,
+    'sharded': ShardedStore,
+}
+
+
+def open_store(path: str, storage: str = WOLFIE_STORAGE, codec: str = JsonCodec.name, shards: int = 0,
+               schema: Schema = None) -> SnapshotStore:
+    """Create the store for a memory path. shards is the bucket count of sharded storage, 0 for a shard per key"""
+    if storage not in STORES:
+        logger.warning(f'Unknown storage {storage}, defaulting to snapshot')
+        storage = 'snapshot'
+    if storage == 'sharded':
+        return ShardedStore(path, codec, shards, schema=schema)
+    return STORES[storage](path, codec, schema=schema)
@@ -0,0 +1,46 @@
+import random
+import time
+
+from cogs.battle.balance import balance
+
+
+def entry(role, primary=False):
+    return {"context": {"role": role, "primary": primary}}
+
+
+class TestBattleBalance:
+
+    def test_moves_over_target(self):
+        teams = {"d1": {"t1": {"1": entry("Sage", True), "2": entry("Sage", True), "3": entry("Sage", True)},
+                        "t2": {"2": entry("Sage"), "3": entry("Sage"), "4": entry("Ranger", True)}}}
+        result = balance(teams, {"t1": 30, "t2": 30}, {"Sage": 2})
+
+        # one sage moves to a slot short of sages, the one with the lowest id keeps their primary
+        assert result.moves == [("3", ("d1", "t1"), ("d1", "t2"))]
+        assert result.composition(teams) == {("d1", "t1"): {"Sage": 2}, ("d1", "t2"): {"Sage": 1, "Ranger": 1}}
+
+    def test_capacity(self):
+        teams = {"d1": {"t1": {"1": entry("Monk", True), "2": entry("Monk", True)},
+                        "t2": {"2": entry("Monk"), "3": entry("Monk")}}}
+        result = balance(teams, {"t1": 1, "t2": 1}, {})
+
+        assert result.placement == {"1": ("d1", "t1"), "2": ("d1", "t2"), "3": None}
+        assert result.moves == [("2", ("d1", "t1"), ("d1", "t2"))]
+
+    def test_few_hundred_registrants(self):
+        random.seed(7)
+        slots = [(d, t) for d in ("d1", "d2") for t in ("t1", "t2", "t3")]
+        teams = {d: {t: {} for t in ("t1", "t2", "t3")} for d in ("d1", "d2")}
+        roles = ["Sage", "ShadowWalker", "Monk", "Centurion", "Ranger", "Guardian", "Zealot", "Magistrate"]
+        for user_id in range(400):
+            role = random.choice(roles)
+            for i, (d, t) in enumerate(random.sample(slots, random.randint(1, 3))):
+                teams[d][t][str(user_id)] = entry(role, i == 0)
+
+        start = time.perf_counter()
+        result = balance(teams, {"t1": 30, "t2": 30, "t3": 30}, {role: 4 for role in roles})
+        assert time.perf_counter() - start < 1
+
+        placed = result.composition(teams)
+        assert all(sum(roles.values()) == 30 for roles in placed.values())
+        assert len(result.placement) == 400
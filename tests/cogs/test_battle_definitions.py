@@ -0,0 +1,45 @@
+from datetime import date
+
+import pytest
+
+from cogs.battle.definitions import BattleDefinition, battle_definitions
+
+# a weekday battle with a smaller last slot
+SIEGE = {
+    "title": "Siege",
+    "days": {"tue": "tuesday", "thu": "thursday"},
+    "slots": {"t1": "02:00", "t2": "08:00", "t3": "14:00", "t10": {"time": "20:00", "capacity": 10}},
+    "capacity": 40,
+    "context": {"primary": "bool", "power": "int"},
+}
+
+
+class TestBattleDefinitions:
+
+    def test_config(self):
+        dawn = battle_definitions()["dawn_battle"]
+        assert dawn.title == "Battle of Dawn"
+        assert dawn.init_data() == {"d1": {"t1": {}, "t2": {}, "t3": {}}, "d2": {"t1": {}, "t2": {}, "t3": {}}}
+
+    def test_lookups(self):
+        siege = BattleDefinition("siege", SIEGE)
+        assert siege.slot("THU", "s10") == ("thu", "t10")
+        assert siege.slot("wed", "t1") is None and siege.slot("tue", "t5") is None
+        assert siege.capacities == {"t1": 40, "t2": 40, "t3": 40, "t10": 10}
+
+        assert siege.parse_filter("-tuet10") == ("tue", "t10")
+        assert siege.parse_filter("t2") == (None, "t2")
+        assert siege.parse_filter("tuet9") is None
+        assert siege.label("thu", "t10") == "Day 2 Slot 4"
+        assert siege.filter_usage().endswith("e.g. tue, t1 or tuet1")
+
+        siege.check_context({"primary": True, "power": 3})
+        with pytest.raises(ValueError):
+            siege.check_context({"role": "Sage"})
+
+    def test_dates(self):
+        siege = BattleDefinition("siege", SIEGE)
+        wednesday = date(2025, 2, 19)
+        assert siege.start_of_week(wednesday) == date(2025, 2, 25)
+        assert siege.start_of_week(wednesday, upcoming=False) == date(2025, 2, 18)
+        assert siege.dates(date(2025, 2, 18)) == {"tue": date(2025, 2, 18), "thu": date(2025, 2, 20)}
@@ -2,6 +2,7 @@ import pytest
 import pytest_asyncio
 
 from cogs.dawn_battle import DawnBattle
+from core.ganglia import Memory
 
 
 @pytest.mark.asyncio
@@ -29,3 +30,38 @@ class TestDawnBattle:
         await battle.add(battle, ctx_user2, "d1", "t1", "sage")
         await battle.add(battle, ctx_user2, "d1", "t2", "sage")
         await battle.add(battle, ctx_user1, "d1", "t1", "ranger")
+
+    @pytest.mark.asyncio
+    async def test_balance(self, battle, ctx_user1, ctx_user2):
+
+        await battle.cortex.forget(Memory.DAWN_BATTLE)
+
+        await battle.add(battle, ctx_user1, "d1", "t1", "sage")
+        await battle.add(battle, ctx_user1, "d1", "t2", "sage")
+        await battle.add(battle, ctx_user2, "d1", "t2", "ranger", "-p")
+
+        # user1 has no primary slot yet, the balance places them
+        await battle.balance(battle, ctx_user1)
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert embed.description.endswith(": unplaced → D1 T2")
+        assert embed.fields[0].name.endswith(" - 2/30")
+        assert embed.fields[0].value == "Ranger 1/4, Sage 1/4"
+
+        # a proposal is not applied once the registrations changed
+        await battle.add(battle, ctx_user2, "d1", "t3", "ranger")
+        await battle.balance(battle, ctx_user1, "apply")
+        assert ctx_user1.send.call_args.args[0].startswith("The registrations changed")
+
+        await battle.balance(battle, ctx_user1)
+        await battle.balance(battle, ctx_user1, "apply")
+        assert ctx_user1.send.call_args.args[0] == "Moved 1 primary slots."
+
+        records = await battle.cortex.get_memory(Memory.DAWN_BATTLE)
+        assert records['d1']['t1']['1']['context']['primary'] is False
+        assert records['d1']['t2']['1']['context']['primary'] is True
+
+        await battle.mine(battle, ctx_user1)
+        assert ctx_user1.send.call_args.kwargs.get('embed').fields[1].value.startswith("⚔️")
+
+        await battle.balance(battle, ctx_user1)
+        assert ctx_user1.send.call_args.kwargs.get('embed').description == "The rosters are balanced, nothing to move."
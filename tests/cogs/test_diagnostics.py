@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from cogs.diagnostics import Diagnostics
+from core.ganglia import Memory
+
+
+@pytest.mark.asyncio
+class TestDiagnostics:
+
+    @pytest_asyncio.fixture
+    async def diagnostics(self, bot):
+        return Diagnostics(bot)
+
+    @pytest.mark.asyncio
+    async def test_lock_striping(self, diagnostics, ctx_user1):
+        cortex = diagnostics.cortex
+
+        async def hold(mem: Memory, key: str = None):
+            async with cortex._locks.acquire(mem, key):
+                await asyncio.sleep(0.01)
+
+        # a save of interactions does not block preferences, two users do not block each other
+        await asyncio.gather(hold(Memory.INTERACTIONS), hold(Memory.PREFERENCES, "1"), hold(Memory.PREFERENCES, "2"))
+        assert all(stats['contended'] == 0 for stats in cortex.lock_stats().values())
+
+        await asyncio.gather(hold(Memory.TITLE_QUEUES), hold(Memory.TITLE_QUEUES, "sage"))
+        assert cortex.lock_stats()[Memory.TITLE_QUEUES.type]['contended'] == 1
+
+        await diagnostics.stats(diagnostics, ctx_user1)
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert embed.fields[0].name == Memory.TITLE_QUEUES.type
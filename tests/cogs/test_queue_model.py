@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytz
+
+from cogs.queue.model import QueueEntry, QueueModel, to_epoch
+
+
+def create_queue() -> dict:
+    return {
+        "entries": [
+            {"user_id": "2", "user_name": "alias2", "time": "2025-02-21T23:00:00-08:00"},
+            {"user_id": "1", "user_name": "alias1", "time": "2025-02-21T21:00:00-08:00"},
+        ],
+        "cursor": 1
+    }
+
+
+class TestQueueModel:
+
+    def test_round_trip(self):
+        queue = QueueModel.from_dict(create_queue())
+        assert [entry.user_id for entry in queue.entries] == ["1", "2"]
+        assert queue.current.user_id == "2"
+
+        # stored records are kept as they were, new entries are stored in UTC
+        queue.add(QueueEntry(to_epoch(pytz.UTC.localize(datetime(2025, 2, 22, 6))), "3", "alias3"))
+        stored = queue.to_dict()
+        assert stored["entries"][0] == create_queue()["entries"][1]
+        assert stored["entries"][1]["time"] == "2025-02-22T06:00:00+00:00"
+        assert QueueModel.from_dict(stored).to_dict() == stored
+
+    def test_remove(self):
+        queue = QueueModel.from_dict(create_queue())
+        first = queue.entries[0]
+        assert queue.has_entry_within("1", first.epoch + 3600)
+
+        queue.remove(first)
+        assert queue.cursor == 0
+        assert first.hour not in queue.slots
+        assert not queue.has_entry_within("1", first.epoch)
+
+    def test_user_index(self):
+        queue = QueueModel.from_dict(create_queue())
+        entry = QueueEntry(queue.entries[0].epoch + 7200, "1", "alias1")
+        queue.add(entry)
+        assert [e.epoch for e in queue.user_entries("1")] == [queue.entries[0].epoch, entry.epoch]
+
+        queue.archive(entry.epoch)
+        assert queue.user_entries("1") == [entry]
+        queue.remove(entry)
+        assert queue.user_entries("1") == [] and "1" not in queue.by_user
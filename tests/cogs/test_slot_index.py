@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytz
+
+from cogs.queue.slot_index import SlotIndex, bit_runs, to_epoch_hour, from_epoch_hour
+
+
+class TestSlotIndex:
+
+    def test_next_free(self):
+        index = SlotIndex([10, 11, 12, 14])
+        assert index.next_free(9, 72) == 13
+        assert index.next_free(12, 72) == 13
+        assert index.next_free(14, 72) == 15
+        assert index.next_free(9, 3) is None
+
+    def test_add_remove(self):
+        index = SlotIndex([10, 12])
+        index.add(11)
+        assert 11 in index
+        assert index.between(10, 12) == [10, 11]
+
+        # duplicate hours from older data stay taken until the last one is removed
+        index.add(12)
+        index.remove(12)
+        assert 12 in index
+        index.remove(12)
+        assert 12 not in index
+        assert index.next_free(9, 72) == 12
+
+    def test_window(self):
+        index = SlotIndex([10, 11, 14])
+        assert index.window(9, 8) == 0b100110
+        assert index.window(12, 72) == 0b100
+
+        # the bitmap follows the earliest taken hour
+        index.add(5)
+        index.remove(10)
+        index.remove(5)
+        index.remove(11)
+        assert index.window(9, 8) == 0b100000
+        index.remove(14)
+        assert index.window(9, 8) == 0
+        index.add(100)
+        assert index.window(98, 4) == 0b100
+        assert bit_runs(~index.window(98, 4) & 0b1111) == [(0, 2), (3, 1)]
+
+    def test_epoch_hour(self):
+        dt = pytz.timezone("US/Pacific").localize(datetime(2025, 2, 21, 21))
+        assert from_epoch_hour(to_epoch_hour(dt)) == dt
@@ -1,3 +1,6 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
 import pytest
 import pytest_asyncio
 import pytz
@@ -5,6 +8,7 @@ from dateutil import parser
 from dotenv import load_dotenv
 from freezegun import freeze_time
 
+from cogs.queue.model import QueueEntry, to_epoch
 from core.ganglia import Memory
 
 load_dotenv()
@@ -67,6 +71,51 @@ class TestTitleQueue:
         embed = ctx_user1.send.call_args.kwargs.get('embed')
         assert len(embed.fields) == 6
 
+    @pytest.mark.asyncio
+    async def test_list_cache(self, title_queue, ctx_user1, ctx_user2, ctx_user3):
+        """Test the rendered list is reused until a queue or preferences change"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        await title_queue.queue_add.__call__(title_queue, ctx_user1, "sage", None, None)
+        cache = title_queue._list_cache
+
+        await title_queue.queue_list(title_queue, ctx_user1, "sage")
+
+        # a hit does not read the memories
+        cortex = title_queue.cortex
+        cortex.get_snapshot = AsyncMock(side_effect=cortex.get_snapshot)
+        await title_queue.queue_list(title_queue, ctx_user2, "sage")
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert not cortex.get_snapshot.called
+        del cortex.get_snapshot
+        assert ctx_user1.send.call_args.kwargs['embed'].fields == ctx_user2.send.call_args.kwargs['embed'].fields
+
+        await title_queue.queue_add.__call__(title_queue, ctx_user2, "sage", None, None)
+        await title_queue.queue_list(title_queue, ctx_user1, "sage")
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        prefs = dict(await title_queue.cortex.get_memory(Memory.PREFERENCES, "1"))
+        await title_queue.cortex.update_memory(Memory.PREFERENCES, "1", dict(prefs, alias="renamed"))
+        await title_queue.queue_list(title_queue, ctx_user1, "sage")
+        assert (cache.hits, cache.misses) == (1, 3)
+        assert "renamed" in ctx_user1.send.call_args.kwargs['embed'].fields[2].name
+        await title_queue.cortex.update_memory(Memory.PREFERENCES, "1", prefs)
+
+        # a queue changed while rendering is not cached under its new version
+        render = title_queue.render_list_fields
+
+        async def change_meanwhile(*args):
+            fields = await render(*args)
+            await title_queue.queue_add.__call__(title_queue, ctx_user3, "sage", None, None)
+            return fields
+
+        title_queue.render_list_fields = change_meanwhile
+        await title_queue.queue_list(title_queue, ctx_user1, "sage")
+        del title_queue.render_list_fields
+        await title_queue.queue_list(title_queue, ctx_user1, "sage")
+        assert (cache.hits, cache.misses) == (1, 5)
+        assert len(ctx_user1.send.call_args.kwargs['embed'].fields) == 6
+
     @pytest.mark.asyncio
     async def test_queue_join(self, title_queue, ctx_user1, ctx_user2, ctx_user3):
         """Test joining a queue"""
@@ -169,6 +218,149 @@ class TestTitleQueue:
         assert total_entries == 3
         validate_entries(queues)
 
+    @pytest.mark.asyncio
+    @freeze_time("2025-02-21 21:00:00-08:00")
+    async def test_queue_batch(self, title_queue, ctx_user1):
+        """Test adding several queues at once"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+
+        await title_queue.queue_add_batch.__call__(title_queue, ctx_user1, "sage", "master@2-22@10PM", "tribune@2-22")
+        queues = await title_queue.cortex.get_memory(Memory.TITLE_QUEUES)
+        assert count_queue_size(queues) == 3
+        validate_entries(queues)
+
+        ctx_user1.send.assert_called_once()
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert len(embed.description.splitlines()) == 4
+
+        # a single invalid spec rejects the whole batch
+        await title_queue.queue_add_batch.__call__(title_queue, ctx_user1, "elder", "sage@2-21@11PM")
+        queues = await title_queue.cortex.get_memory(Memory.TITLE_QUEUES)
+        assert count_queue_size(queues) == 3
+        assert "Nothing was added" in ctx_user1.send.call_args.args[0]
+
+    @pytest.mark.asyncio
+    @freeze_time("2025-02-21 21:00:00-08:00")
+    async def test_queue_mine(self, title_queue, ctx_user1, ctx_user2):
+        """Test listing the entries of a user across queues"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        await title_queue.queue_add_batch.__call__(title_queue, ctx_user1, "sage@2-22@10PM", "master")
+        await title_queue.queue_add.__call__(title_queue, ctx_user2, "master", None, None)
+
+        await title_queue.queue_mine.__call__(title_queue, ctx_user1)
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert [field.name.split(" ", 1)[1] for field in embed.fields] == [QUEUES["master"], QUEUES["sage"]]
+
+        await title_queue.queue_remove.__call__(title_queue, ctx_user1, "master", None)
+        reservations = await title_queue.user_reservations(title_queue.cortex, "1")
+        assert [queue_name for queue_name, _ in reservations] == ["sage"]
+
+    @pytest.mark.asyncio
+    @freeze_time("2025-02-21 21:00:00-08:00")
+    async def test_queue_free(self, title_queue, ctx_user1, ctx_user2):
+        """Test listing the free hours of the queues"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        await title_queue.queue_add_batch.__call__(title_queue, ctx_user1, "sage@2-22@1AM")
+        await title_queue.queue_free.__call__(title_queue, ctx_user2, "sage")
+        embed = ctx_user2.send.call_args.kwargs.get('embed')
+        assert len(embed.fields) == 1
+        # user1 is on pacific time, user2 on UTC
+        assert embed.fields[0].value == "02-22 06:00-09:00, 02-22 10:00-02-25 06:00"
+
+        await title_queue.queue_free.__call__(title_queue, ctx_user2)
+        embed = ctx_user2.send.call_args.kwargs.get('embed')
+        assert embed.fields[0].name == "Any title" and len(embed.fields) == len(QUEUES) + 1
+        assert embed.fields[0].value.count(",") == 0
+
+    @pytest.mark.asyncio
+    @freeze_time("2025-02-22 05:00:00+00:00")
+    async def test_queue_import_export(self, title_queue, ctx_admin):
+        """Test importing a planned schedule and exporting it again"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        plan = (b"queue,user_id,user_name,time\n"
+                b"sage,1,alias1,2025-02-22T06:00:00Z\n"
+                b"sage,2,,2025-02-22T06:00\n"        # slot taken
+                b"master,2,,2025-02-22T07:30\n"      # not on the hour
+                b"knight,1,,2025-02-22T07:00\n"      # unknown queue
+                b"sage,1,,2025-02-22T08:00\n"        # within 24 hours
+                b"tribune,3,,2025-02-21T01:00\n"     # past
+                b"master,3,alias3,2025-02-22T07:00\n")
+        ctx_admin.message = attach("plan.csv", plan)
+        await title_queue.queue_import.__call__(title_queue, ctx_admin)
+
+        assert ctx_admin.send.call_args.args[0].startswith("Imported 2 entries, skipped 5 rows.")
+        assert "line 3: time slot is already taken" in ctx_admin.send.call_args.args[0]
+        queues = await title_queue.cortex.get_memory(Memory.TITLE_QUEUES)
+        assert count_queue_size(queues) == 2
+
+        await title_queue.queue_export.__call__(title_queue, ctx_admin, "jsonl")
+        exported = ctx_admin.send.call_args.kwargs["file"].fp.read()
+        assert len(exported.splitlines()) == 2
+
+        # an export imports back into empty queues
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        ctx_admin.message = attach("title_queues.jsonl", exported)
+        await title_queue.queue_import.__call__(title_queue, ctx_admin)
+        assert ctx_admin.send.call_args.args[0] == "Imported 2 entries, skipped 0 rows."
+        assert (await title_queue.get_queue(title_queue.cortex, "master")).entries[0].alias == "alias3"
+
+    @pytest.mark.asyncio
+    async def test_leadership_commands(self, title_queue, ctx_admin, ctx_leadership, ctx_user2):
+        """Only members managing the guild or with the leadership role import and export"""
+
+        for command in (title_queue.queue_import, title_queue.queue_export):
+            (check,) = command.checks
+            assert await check(ctx_admin)
+            assert await check(ctx_leadership)
+            assert not await check(ctx_user2)
+
+    @pytest.mark.asyncio
+    async def test_advance_and_archive(self, title_queue, ctx_user1, ctx_user2, ctx_user3):
+        """Test the hourly cursor advance and archival"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        await title_queue.cortex.forget(Memory.TITLE_QUEUE_ARCHIVE)
+
+        # slots at 06:00, 07:00 and 08:00 UTC
+        with freeze_time("2025-02-21 21:00:00-08:00"):
+            for ctx in [ctx_user1, ctx_user2, ctx_user3]:
+                await title_queue.queue_add.__call__(title_queue, ctx, "sage", None, None)
+
+        assert await title_queue.advance(parser.isoparse("2025-02-22T07:30:00+00:00")) == 0
+        assert (await title_queue.get_queue(title_queue.cortex, "sage")).cursor == 1
+
+        assert await title_queue.advance(parser.isoparse("2025-02-23T07:30:00+00:00")) == 2
+        queues = await title_queue.cortex.get_memory(Memory.TITLE_QUEUES)
+        assert count_queue_size(queues) == 1
+        assert queues["sage"]["cursor"] == 1
+
+        archive = await title_queue.cortex.get_memory(Memory.TITLE_QUEUE_ARCHIVE)
+        assert [entry["user_id"] for entry in archive["2025-02"]["sage"]] == ["1", "2"]
+
+    @pytest.mark.asyncio
+    async def test_list_past_entries(self, title_queue):
+        """Entries older than two hours are not listed, the cursor still points into every entry"""
+
+        await title_queue.cortex.forget(Memory.TITLE_QUEUES)
+        hour = to_epoch(parser.isoparse("2025-02-22T12:00:00+00:00"))
+        queue = await title_queue.get_queue(title_queue.cortex, "sage")
+        for i, offset in enumerate([-5, -4, -3, -1, 0, 1]):
+            queue.add(QueueEntry(hour + offset * 3600, str(i + 1), f"alias{i + 1}"))
+        await title_queue.commit_queue(title_queue.cortex, "sage", queue)
+
+        with freeze_time("2025-02-22 12:30:00+00:00"):
+            await title_queue.advance(parser.isoparse("2025-02-22T12:30:00+00:00"))
+            fields = await title_queue.render_list_fields(title_queue.cortex, ("sage",), hour // 3600)
+        assert [name.split()[0] for name, _ in fields[2:-1]] == ["✅", "⏳", "⏳"]
+
+
+def attach(filename: str, content: bytes):
+    return SimpleNamespace(attachments=[SimpleNamespace(filename=filename, read=AsyncMock(return_value=content))])
+
 
 def count_queue_size(data):
 
@@ -1,7 +1,14 @@
+import asyncio
+
 import pytest
 import pytest_asyncio
+from dateutil import parser
+from freezegun import freeze_time
 from sqlalchemy import false
 
+from cogs.battle.definitions import battle_definitions
+from cogs.battle.registered_battle import slot_times
+from cogs.dawn_battle import DawnBattle
 from cogs.wonder_battle import WonderBattle
 from core.ganglia import Memory
 
@@ -53,6 +60,104 @@ class TestWonderBattle:
         assert battle_records['d1']['t3']['2'] == {'context': {'primary': False}}
 
 
+    @pytest.mark.asyncio
+    async def test_mine(self, battle, ctx_user1, ctx_user2):
+
+        await battle.cortex.forget(Memory.WONDER_BATTLE)
+
+        await battle.add(battle, ctx_user1, "d2", "t1", "-p")
+        await battle.add(battle, ctx_user1, "d1", "t3")
+        await battle.add(battle, ctx_user2, "d1", "t1", "-p")
+        await battle.remove(battle, ctx_user1, "d1", "t3")
+        await battle.add(battle, ctx_user1, "d1", "t2", "-p")
+
+        # one message for the cleared primary slot
+        assert ctx_user1.send.call_args_list[-2].args[0] == "Removed primary d2 t1 slot"
+
+        await battle.mine(battle, ctx_user1)
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert [field.name.split(" (")[0] for field in embed.fields] == ["🗓️ Day 1 Slot 2", "🗓️ Day 2 Slot 1"]
+        assert embed.fields[0].value.startswith("⚔️")
+        assert not embed.fields[1].value.startswith("⚔️")
+
+    @pytest.mark.asyncio
+    async def test_rollover(self, battle, ctx_user1, ctx_user2):
+
+        await battle.cortex.forget(Memory.WONDER_BATTLE)
+        await battle.cortex.forget(Memory.BATTLE_HISTORY)
+
+        await battle.add(battle, ctx_user1, "d1", "t2", "-p")
+        await battle.add(battle, ctx_user2, "d2", "t1")
+
+        # without a rollover recorded, the registrations are kept
+        assert await battle.rollover(parser.isoparse("2025-02-17T00:00:00+00:00")) == 0
+        assert await battle.rollover(parser.isoparse("2025-02-24T00:00:00+00:00")) == 2
+        battle_records = await battle.cortex.get_memory(Memory.WONDER_BATTLE)
+        assert all(not members for slots in battle_records.values() for members in slots.values())
+
+        history = await battle.cortex.get_memory(Memory.BATTLE_HISTORY, "2025-W08")
+        assert history[Memory.WONDER_BATTLE.type] == {
+            "dates": {"d1": "02-22", "d2": "02-23"},
+            "slots": {"d1": {"t2": {"1": {"primary": True}}}, "d2": {"t1": {"2": {"primary": False}}}}}
+        assert await battle.rollover(parser.isoparse("2025-02-24T00:00:00+00:00")) == 0
+
+        with freeze_time("2025-02-26"):
+            await battle.history(battle, ctx_user1, 2)
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert [(field.name, field.value) for field in embed.fields] == [("2025-W08 (02-22 / 02-23)", "Day 1 Slot 2 ⚔️️")]
+
+    @pytest.mark.asyncio
+    async def test_rollover_catch_up(self, bot, battle, ctx_user1, ctx_user2):
+
+        dawn = DawnBattle(bot)
+        await battle.cortex.forget(Memory.WONDER_BATTLE)
+        await battle.cortex.forget(Memory.DAWN_BATTLE)
+        await battle.cortex.forget(Memory.BATTLE_HISTORY)
+        await battle.rollover(parser.isoparse("2025-02-17T00:00:00+00:00"))
+        await dawn.rollover(parser.isoparse("2025-02-17T00:00:00+00:00"))
+
+        await battle.add(battle, ctx_user1, "d1", "t2")
+        await dawn.add(dawn, ctx_user2, "d2", "t1", "sage")
+
+        # both battles roll over at once, and the rollover of 03-03 was missed: archived under the week of 02-22
+        missed = parser.isoparse("2025-03-04T00:00:00+00:00")
+        assert await asyncio.gather(battle.rollover(missed), dawn.rollover(missed)) == [1, 1]
+
+        history = await battle.cortex.get_memory(Memory.BATTLE_HISTORY, "2025-W08")
+        assert history[Memory.WONDER_BATTLE.type]["slots"] == {"d1": {"t2": {"1": {"primary": False}}}}
+        assert history[Memory.DAWN_BATTLE.type]["slots"] == {"d2": {"t1": {"2": {"role": "Sage", "primary": False}}}}
+        history = await battle.cortex.get_memory(Memory.BATTLE_HISTORY, "2025-W09")
+        assert history[Memory.WONDER_BATTLE.type] == {"dates": {"d1": "03-01", "d2": "03-02"}, "slots": {}}
+
+        # the next rollover is on time again, a registration made while archiving is kept for the week after
+        await battle.add(battle, ctx_user1, "d1", "t1")
+        record_rollover = battle.record_rollover
+
+        async def register_meanwhile(*args):
+            await battle.add(battle, ctx_user2, "d2", "t3")
+            return await record_rollover(*args)
+
+        battle.record_rollover = register_meanwhile
+        assert await battle.rollover(parser.isoparse("2025-03-10T00:00:00+00:00")) == 1
+        del battle.record_rollover
+
+        history = await battle.cortex.get_memory(Memory.BATTLE_HISTORY, "2025-W10")
+        assert history[Memory.WONDER_BATTLE.type] == {
+            "dates": {"d1": "03-08", "d2": "03-09"}, "slots": {"d1": {"t1": {"1": {"primary": False}}}}}
+        battle_records = await battle.cortex.get_memory(Memory.WONDER_BATTLE)
+        assert battle_records['d1']['t1'] == {}
+        assert battle_records['d2']['t3'] == {'2': {'context': {'primary': False}}}
+
+    @pytest.mark.asyncio
+    @freeze_time("2025-12-29 12:00:00+00:00")
+    async def test_slot_times(self):
+        # the weekend after new year is in the next year
+        table = slot_times(battle_definitions()[Memory.WONDER_BATTLE.type])
+        assert table.utc[("d2", "t3")].isoformat() == "2026-01-04T19:00:00+00:00"
+        assert table.utc_label("d1", "t1") == "01-03 01:00 UTC"
+        assert table.local("d1", "t1", "US/Pacific") == "01-02 17:00 PST"
+        assert slot_times(battle_definitions()[Memory.WONDER_BATTLE.type]) is table
+
     @pytest.mark.asyncio
     async def test_list(self, battle, ctx_user1, ctx_user2, ctx_user3):
 
@@ -72,6 +177,17 @@ class TestWonderBattle:
         embed = ctx_user1.send.call_args.kwargs.get('embed')
         assert len(embed.fields) == 6
 
+        await battle.wonder_list(battle, ctx_user1, "d2t3")
+        embed = ctx_user1.send.call_args.kwargs.get('embed')
+        assert [field.name.split(" (")[0] for field in embed.fields] == ["🗓️ Day 2 Slot 3"]
+
+        await battle.wonder_list(battle, ctx_user1, "sat")
+        assert ctx_user1.send.call_args.args[0].startswith("Invalid format. Use a day, a time slot or both")
+
+        # fields the battle does not define are reported, not raised
+        await battle.register(ctx_user1, "d1", "t1", power=3)
+        assert ctx_user1.send.call_args.args[0] == "Invalid registration: wonder_battle has no registration field power."
+
     @pytest.mark.asyncio
     async def test_basic_all(self, battle, ctx_user1, ctx_user2):
 
@@ -30,7 +30,7 @@ class MockBot:
         self.user = discord.Object(id=1)
         self.command_prefix = "!"
         self.commands: List[commands.Command] = []
-        self.cortex = Cortex()
+        self.cortex = Cortex(flush_interval_ms=0)  # write-through, tests read each other's data from disk
 
     async def get_prefix(self, message):
         return self.command_prefix
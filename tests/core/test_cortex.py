@@ -0,0 +1,102 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from cogs.dawn_battle import DawnBattle
+from cogs.title_queue import TitleQueue
+from core.cortex import Cortex
+from core.ganglia import Memory
+
+
+@pytest.mark.asyncio
+class TestCortex:
+
+    @pytest_asyncio.fixture
+    async def cortex(self):
+        cortex = Cortex(flush_interval_ms=20)
+        cortex.persisted = []
+        for memory in Memory:
+            store = cortex._memory[memory.type]._store
+            store.persist = self._recorder(cortex.persisted, memory)
+        return cortex
+
+    @staticmethod
+    def _recorder(persisted: list, memory: Memory):
+        async def persist(data, keys=None):
+            persisted.append((memory, keys))
+        return persist
+
+    @pytest.mark.asyncio
+    async def test_coalesce_remember(self, cortex):
+        for i in range(10):
+            await cortex.update_memory(Memory.INTERACTIONS, str(i), {"history": []})
+            await cortex.remember(Memory.INTERACTIONS)
+        assert cortex.persisted == []
+
+        await asyncio.sleep(0.05)
+        assert cortex.persisted == [(Memory.INTERACTIONS, {str(i) for i in range(10)})]
+        assert not cortex._memory[Memory.INTERACTIONS.type].is_modified
+
+    @pytest.mark.asyncio
+    async def test_only_flush_modified(self, cortex):
+        await cortex.update_memory(Memory.PREFERENCES, "1", {"alias": "alias1"})
+        await cortex.flush()
+        await cortex.update_memory(Memory.TITLE_QUEUES, "sage", {"entries": [], "cursor": 0})
+        await cortex.flush()
+
+        # preferences are not saved again once flushed
+        assert cortex.persisted == [(Memory.PREFERENCES, {"1"}), (Memory.TITLE_QUEUES, {"sage"})]
+
+    @pytest.mark.asyncio
+    async def test_flush_on_shutdown(self, cortex):
+        await cortex.update_memory(Memory.DAWN_BATTLE, "d1", {"t1": {}, "t2": {}, "t3": {}})
+        await cortex.remember(Memory.DAWN_BATTLE)
+        await cortex.shutdown()
+
+        assert cortex.persisted == [(Memory.DAWN_BATTLE, {"d1"})]
+        await asyncio.sleep(0.05)
+        assert len(cortex.persisted) == 1
+
+    @pytest.mark.asyncio
+    async def test_shared_events_view(self, cortex, ctx_user1):
+        bot = SimpleNamespace(cortex=cortex)
+        title_queue, dawn_battle = TitleQueue(bot), DawnBattle(bot)
+
+        # listing is read-only
+        await title_queue.queue_list(title_queue, ctx_user1)
+        await dawn_battle.list(dawn_battle, ctx_user1, "all")
+        await asyncio.sleep(0.05)
+        assert cortex.persisted == []
+
+        shared_events = await cortex.get_shared_events()
+        assert shared_events.keys() == {Memory.TITLE_QUEUES.type, Memory.DAWN_BATTLE.type}
+        assert all(isinstance(summary, str) for summary in shared_events.values())
+
+    @pytest.mark.asyncio
+    async def test_guild_namespaces(self, ctx_user1, ctx_user2):
+        cortex = Cortex(flush_interval_ms=0, guild_namespaces=True, primary_guild_id="1")
+        cortex.initialize_memory(Memory.INTERACTIONS, {})
+        guild = cortex.for_guild(2)
+        assert cortex.for_guild(ctx_user1.guild) is cortex and cortex.for_guild(None) is cortex
+        assert cortex.for_guild("2") is guild
+
+        # each guild reads and writes its own files
+        await guild.update_memory(Memory.INTERACTIONS, "2", {"history": [{"question": "q"}]})
+        version = guild.get_version(Memory.INTERACTIONS)
+        await cortex.flush()
+        assert os.path.isdir(os.path.dirname(Memory.INTERACTIONS.data_path("2")))
+        assert await cortex.get_memory(Memory.INTERACTIONS, "2") == {}
+
+        # idle guilds are closed and reopened from disk
+        assert "2/" + Memory.INTERACTIONS.type in cortex.unload_idle(0)
+        assert cortex.for_guild(2) is not guild
+        assert (await cortex.for_guild(2).get_memory(Memory.INTERACTIONS, "2"))["history"] == [{"question": "q"}]
+
+        # versions of a reopened guild never repeat the ones of its previous opening, caches keyed by them stay valid
+        assert cortex.for_guild(2).get_version(Memory.INTERACTIONS) > version
+        await cortex.forget(Memory.INTERACTIONS)
+        await cortex.for_guild(2).forget(Memory.INTERACTIONS)
+        await cortex.shutdown()
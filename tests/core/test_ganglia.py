@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from core.ganglia import BasalGanglia, GangliaInterface, Memory
+from core.hippocampus import write_data_to_path
+
+
+@pytest.mark.asyncio
+class TestBasalGanglia:
+
+    @pytest.mark.asyncio
+    async def test_snapshot(self, tmp_path):
+        ganglia = BasalGanglia(str(tmp_path / "title_queue.json"))
+        ganglia.initialize({"sage": {"entries": [], "cursor": 0}, "master": {"entries": [], "cursor": 0}})
+
+        snapshot = await ganglia.snapshot()
+        assert await ganglia.snapshot() is snapshot
+        assert snapshot.version == ganglia.version
+        with pytest.raises(TypeError):
+            snapshot.data["sage"]["entries"].append({"user_id": "1"})
+
+        sage = await ganglia.get("sage")
+        sage["entries"].append({"user_id": "1"})
+        await ganglia.update("sage", sage)
+
+        # readers holding the old snapshot are not affected, unchanged keys are shared
+        latest = await ganglia.snapshot()
+        assert latest.version != snapshot.version
+        assert snapshot.data["sage"]["entries"] == []
+        assert latest.data["sage"]["entries"] == [{"user_id": "1"}]
+        assert latest.data["master"] is snapshot.data["master"]
+
+    @pytest.mark.asyncio
+    async def test_lazy_load(self, tmp_path):
+        path = str(tmp_path / "wonder_battle.json")
+        write_data_to_path({"d1": {"t1": {"1": {"context": {"primary": True}}}}}, path)
+
+        ganglia = BasalGanglia(path, "snapshot")
+        ganglia.initialize({"d1": {"t1": {}}, "d2": {"t1": {}}})
+        assert not ganglia.is_loaded
+
+        loads = []
+        reload = ganglia._store.reload
+        async def counting_reload():
+            loads.append(1)
+            return await reload()
+        ganglia._store.reload = counting_reload
+
+        results = await asyncio.gather(*(ganglia.get("d1") for _ in range(5)))
+        assert len(loads) == 1
+        assert all(result == {"t1": {"1": {"context": {"primary": True}}}} for result in results)
+
+        # init data only applies to an empty memory
+        assert "d2" not in await ganglia.get_all()
+
+    @pytest.mark.asyncio
+    async def test_unload_idle(self, tmp_path):
+        interface = GangliaInterface(memory_idle_unload_s=0)
+        ganglia = BasalGanglia(str(tmp_path / "interactions.json"))
+        interface._memory[Memory.INTERACTIONS.type] = ganglia
+
+        await interface.update_memory(Memory.INTERACTIONS, "1", {"history": []})
+        assert interface.unload_idle(0) == []  # not saved yet
+
+        await interface.save_memory(Memory.INTERACTIONS)
+        assert interface.unload_idle(0) == [Memory.INTERACTIONS.type]
+        assert not ganglia.is_loaded
+
+        assert await interface.get_memory(Memory.INTERACTIONS, "1") == {"history": []}
+        assert ganglia.is_loaded
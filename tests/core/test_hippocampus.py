@@ -0,0 +1,222 @@
+import json
+import os
+
+import pytest
+
+from core.ganglia import BasalGanglia
+from core.ganglia import Memory
+from core.hippocampus import JournalStore, ShardedStore, SnapshotStore, SqliteStore, write_data_to_path, load_data_from_path
+from utils.codec_utils import CODECS
+from utils.schema_utils import SchemaError
+
+
+@pytest.mark.asyncio
+class TestJournalStore:
+
+    @pytest.mark.asyncio
+    async def test_rebuild_from_snapshot_and_log(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+
+        store = JournalStore(path)
+        data = {"sage": {"entries": [], "cursor": 0}, "master": {"entries": [], "cursor": 0}}
+        await store.persist(data)
+
+        data["sage"]["entries"].append({"user_id": "1", "time": "2025-02-21T21:00:00+00:00"})
+        await store.persist(data, {"sage"})
+        del data["master"]
+        await store.persist(data, {"master"})
+
+        # only the changed keys are appended, the snapshot is untouched
+        assert "master" in load_data_from_path(path)
+        with open(store.log_path) as file:
+            assert len(file.readlines()) == 2
+
+        assert JournalStore(path).load() == data
+
+    @pytest.mark.asyncio
+    async def test_ignore_torn_record(self, tmp_path):
+        path = str(tmp_path / "interactions.json")
+
+        store = JournalStore(path)
+        await store.persist({"1": {"history": []}}, {"1"})
+        with open(store.log_path, "a") as file:
+            file.write('{"op": "set", "key": "2", "val')
+
+        assert JournalStore(path).load() == {"1": {"history": []}}
+
+    @pytest.mark.asyncio
+    async def test_compaction(self, tmp_path):
+        path = str(tmp_path / "user_preferences.json")
+
+        store = JournalStore(path, compact_bytes=256)
+        data = {}
+        for i in range(10):
+            data[str(i)] = {"alias": f"alias{i}", "timezone": "UTC"}
+            await store.persist(data, {str(i)})
+        await store.compact(data)
+
+        assert not os.path.exists(store.log_path)
+        assert not os.path.exists(store.rotated_log_path)
+        assert load_data_from_path(path) == data
+        assert JournalStore(path).load() == data
+
+
+@pytest.mark.asyncio
+class TestSnapshotStore:
+
+    @pytest.mark.asyncio
+    async def test_atomic_replace(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+
+        store = SnapshotStore(path)
+        await store.persist({"sage": {"entries": [], "cursor": 0}})
+
+        # an unserializable value fails before the file is touched
+        with pytest.raises(TypeError):
+            await store.persist({"sage": {"entries": [object()], "cursor": 0}})
+
+        assert await store.reload() == {"sage": {"entries": [], "cursor": 0}}
+        assert os.listdir(tmp_path) == ["title_queue.json"]
+
+
+@pytest.mark.asyncio
+class TestSqliteStore:
+
+    @pytest.mark.asyncio
+    async def test_migrate_from_json(self, tmp_path):
+        path = str(tmp_path / "user_preferences.json")
+        write_data_to_path({"1": {"alias": "alias1"}, "2": {"alias": "alias2"}}, path)
+
+        store = SqliteStore(path)
+        assert await store.fetch("2") == {"alias": "alias2"}
+        assert await store.fetch("3") is None
+
+        # migration only runs when the database is created
+        write_data_to_path({}, path)
+        assert SqliteStore(path).load() == {"1": {"alias": "alias1"}, "2": {"alias": "alias2"}}
+
+    @pytest.mark.asyncio
+    async def test_upsert_changed_keys(self, tmp_path):
+        path = str(tmp_path / "user_preferences.json")
+
+        ganglia = BasalGanglia(path, 'sqlite')
+        await ganglia.update("1", {"alias": "alias1"})
+        await ganglia.update("2", {"alias": "alias2"})
+        await ganglia.save()
+
+        ganglia = BasalGanglia(path, 'sqlite')
+        assert await ganglia.get("1") == {"alias": "alias1"}
+        assert ganglia._data.keys() == {"1"}
+
+        await ganglia.update("1", {"alias": "renamed"})
+        await ganglia.save()
+        assert await BasalGanglia(path, 'sqlite').get_all() == {"1": {"alias": "renamed"}, "2": {"alias": "alias2"}}
+
+
+@pytest.mark.asyncio
+class TestShardedStore:
+
+    @pytest.mark.asyncio
+    async def test_shard_per_key(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+        write_data_to_path({"sage": {"entries": [], "cursor": 0}, "master": {"entries": [], "cursor": 0}}, path)
+
+        store = ShardedStore(path)
+        assert await store.fetch("sage") == {"entries": [], "cursor": 0}
+        assert sorted(os.listdir(store.shard_dir)) == ["master.shard", "sage.shard"]
+
+        master_mtime = os.stat(store.shard_path("master")).st_mtime_ns
+        data = store.load()
+        data["sage"]["entries"].append({"user_id": "1"})
+        del data["master"]
+        data["border/north"] = {"entries": [], "cursor": 0}
+        await store.persist(data, {"sage", "border/north"})
+
+        # only the changed shards are written
+        assert os.stat(store.shard_path("master")).st_mtime_ns == master_mtime
+        assert load_data_from_path(store.shard_path("sage")) == {"sage": {"entries": [{"user_id": "1"}], "cursor": 0}}
+
+        await store.persist(data, {"master"})
+        assert ShardedStore(path).load() == data
+
+    @pytest.mark.asyncio
+    async def test_buckets(self, tmp_path):
+        path = str(tmp_path / "interactions.json")
+
+        ganglia = BasalGanglia(path, 'sharded', shards=4)
+        for i in range(20):
+            await ganglia.update(str(i), {"history": [i]})
+        await ganglia.save()
+        assert len(os.listdir(ganglia._store.shard_dir)) == 4
+
+        # a bucket keeps the keys that were never loaded
+        ganglia = BasalGanglia(path, 'sharded', shards=4)
+        await ganglia.update("1", {"history": []})
+        await ganglia.save()
+        assert ganglia._data.keys() == {"1"}
+
+        chunks = [chunk async for chunk in ganglia._store.stream()]
+        assert len(chunks) == 4
+        assert (await BasalGanglia(path, 'sharded', shards=4).get_all()) == \
+               {str(i): {"history": [] if i == 1 else [i]} for i in range(20)}
+
+
+@pytest.mark.asyncio
+class TestCodecs:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("codec", CODECS.keys())
+    async def test_detect_codec(self, tmp_path, codec):
+        path = str(tmp_path / "interactions.json")
+        data = {"1": {"history": [{"question": "q", "response": "r"}]}}
+
+        await SnapshotStore(path, codec).persist(data)
+        assert load_data_from_path(path) == data
+
+    @pytest.mark.asyncio
+    async def test_load_legacy_json(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+        with open(path, "w") as file:
+            json.dump({"sage": {"entries": [], "cursor": 0}}, file, indent=2)
+
+        assert SnapshotStore(path).load() == {"sage": {"entries": [], "cursor": 0}}
+
+
+@pytest.mark.asyncio
+class TestSchemas:
+
+    @pytest.mark.asyncio
+    async def test_validate(self):
+        schema = Memory.TITLE_QUEUES.schema
+        schema.validate({"sage": {"entries": [{"user_id": "1", "user_name": "a", "time": "t", "note": "x"}], "cursor": 0}})
+
+        with pytest.raises(SchemaError) as error:
+            schema.validate({"sage": {"entries": [{"user_id": 1, "user_name": "a", "time": "t"}], "cursor": 0}})
+        assert str(error.value) == "sage.entries.0.user_id: expected str, got int"
+
+    @pytest.mark.asyncio
+    async def test_migrate_legacy_file(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+        with open(path, "w") as file:
+            json.dump({"sage": [], "master": {"entries": [], "cursor": 2}}, file)
+
+        store = SnapshotStore(path, schema=Memory.TITLE_QUEUES.schema)
+        assert store.load() == {"sage": {"entries": [], "cursor": 0}, "master": {"entries": [], "cursor": 2}}
+
+    @pytest.mark.asyncio
+    async def test_quarantine_and_restore_backup(self, tmp_path):
+        path = str(tmp_path / "title_queue.json")
+        store = SnapshotStore(path, schema=Memory.TITLE_QUEUES.schema)
+        for cursor in range(3):
+            await store.persist({"sage": {"entries": [], "cursor": cursor}})
+
+        # truncate the current file and damage the newest backup
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 5)
+        with open(f"{path}.bak.1", "r+b") as file:
+            file.seek(-3, os.SEEK_END)
+            file.write(b"999")
+
+        assert store.load() == {"sage": {"entries": [], "cursor": 0}}
+        assert any(name.startswith("title_queue.json.corrupt-") for name in os.listdir(tmp_path))
+        assert SnapshotStore(path, schema=Memory.TITLE_QUEUES.schema).load() == {"sage": {"entries": [], "cursor": 0}}
@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+# Caches by name, for diagnostics. A newer cache with the same name replaces the older one
+CACHES: dict = {}
+
+
+class RenderCache:
+    """
+    Least recently used cache of rendered output, keyed by everything the output was built from
+    (typically memory versions), so entries never need explicit invalidation.
+    """
+
+    def __init__(self, name: str, max_size: int = 64):
+        self.name = name
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        CACHES[name] = self
+
+    def get(self, key):
+        """Returns the cached value for key, None on a miss"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+def cache_stats() -> dict:
+    return {name: cache.stats() for name, cache in CACHES.items()}
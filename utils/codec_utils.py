@@ -0,0 +1,98 @@
+"""
+Serialization codecs for memory files.
+
+Every encoded file starts with a one line header naming its codec, the schema
+version of the data and the crc32 of the payload:
+    WLF1 codec=json schema=1 crc=1c291ca3\n<payload>
+
+Files without the header are read as plain JSON, which is how memories were
+stored before codecs existed.
+"""
+
+import copy
+import json
+import marshal
+import zlib
+
+HEADER_MAGIC = b'WLF1'
+
+
+class JsonCodec:
+    """Compact JSON, no whitespace"""
+    name = 'json'
+
+    def encode(self, data: dict) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, payload: bytes) -> dict:
+        return json.loads(payload)
+
+
+class PrettyJsonCodec(JsonCodec):
+    """Indented JSON, for reading memory files while debugging"""
+    name = 'json-pretty'
+
+    def encode(self, data: dict) -> bytes:
+        return json.dumps(data, indent=2).encode('utf-8')
+
+
+class MarshalCodec:
+    """Python's stdlib binary format, smallest and fastest to load. Opt-in, the format may change between Python versions"""
+    name = 'marshal'
+
+    def encode(self, data: dict) -> bytes:
+        try:
+            return marshal.dumps(data)
+        except ValueError:
+            # read-only snapshot types are dict/list subclasses, which marshal refuses
+            return marshal.dumps(copy.deepcopy(data))
+
+    def decode(self, payload: bytes) -> dict:
+        return marshal.loads(payload)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), PrettyJsonCodec(), MarshalCodec())}
+
+
+class CorruptDataError(ValueError):
+    """The payload does not match the checksum in its header"""
+
+
+def encode(data: dict, codec_name: str, schema: int = None) -> bytes:
+    """Returns the header followed by data encoded with the named codec"""
+    codec = CODECS[codec_name]
+    payload = codec.encode(data)
+    header = f' codec={codec.name}' + (f' schema={schema}' if schema is not None else '')
+    return HEADER_MAGIC + f'{header} crc={zlib.crc32(payload):08x}\n'.encode('ascii') + payload
+
+
+def parse_header(raw: bytes) -> tuple[dict, bytes]:
+    """Split raw file content into (header fields, payload). Files without a header have no fields"""
+    if not raw.startswith(HEADER_MAGIC):
+        return {}, raw
+
+    header, _, payload = raw.partition(b'\n')
+    fields = dict(token.split('=', 1) for token in header.decode('ascii').split()[1:])
+    return fields, payload
+
+
+def verify(raw: bytes) -> tuple[dict, bytes]:
+    """parse_header, raising CorruptDataError if the payload does not match its checksum"""
+    fields, payload = parse_header(raw)
+    if 'crc' in fields and int(fields['crc'], 16) != zlib.crc32(payload):
+        raise CorruptDataError(f'Checksum mismatch, expected {fields["crc"]}')
+    return fields, payload
+
+
+def decode_with_header(raw: bytes) -> tuple[dict, dict]:
+    """Verify and decode raw file content. Returns (header fields, data)"""
+    fields, payload = verify(raw)
+    codec_name = fields.get('codec', JsonCodec.name)
+    if codec_name not in CODECS:
+        raise ValueError(f'Unknown codec {codec_name}')
+    return fields, CODECS[codec_name].decode(payload)
+
+
+def decode(raw: bytes) -> dict:
+    """Decode raw file content, detecting the codec from the header"""
+    return decode_with_header(raw)[1]
@@ -51,8 +51,7 @@ def has_required_permissions():
         if any(str(role.name).lower() in ALLOWED_ROLES for role in ctx.author.roles):
             return True
 
-        # for testing
-        return True
+        return False
 
     return commands.check(predicate)
 
@@ -0,0 +1,114 @@
+"""
+Schemas describing the layout of memory files.
+
+A spec is a nested description of the expected data:
+    str, int, dict, ...          the value is an instance of the type, object accepts anything
+    [spec]                       a list whose items match spec
+    {str: spec}                  a dict whose keys are str and values match spec
+    {"name": spec, ...}          a dict with at least these fields, extra fields are allowed
+
+Specs are compiled into nested validator functions once, validating data is a
+single pass over it.
+"""
+
+from typing import Callable
+
+
+class SchemaError(ValueError):
+    """Data does not match its schema, path points at the offending value"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+        self.path = []
+
+    def at(self, key) -> 'SchemaError':
+        self.path.insert(0, str(key))
+        return self
+
+    def __str__(self):
+        return f'{".".join(self.path) or "<root>"}: {self.reason}'
+
+
+def _expect(value, expected: type):
+    if not isinstance(value, expected):
+        raise SchemaError(f'expected {expected.__name__}, got {type(value).__name__}')
+
+
+def compile_validator(spec) -> Callable[[object], None]:
+    """Returns a function raising SchemaError if its argument does not match spec"""
+    if spec is object:
+        return lambda value: None
+
+    if isinstance(spec, type):
+        return lambda value: _expect(value, spec)
+
+    if isinstance(spec, list):
+        (item_spec,) = spec
+        check_item = compile_validator(item_spec)
+
+        def check_list(value):
+            _expect(value, list)
+            for index, item in enumerate(value):
+                try:
+                    check_item(item)
+                except SchemaError as e:
+                    raise e.at(index)
+        return check_list
+
+    if isinstance(spec, dict) and len(spec) == 1 and isinstance(next(iter(spec)), type):
+        ((key_type, value_spec),) = spec.items()
+        check_value = compile_validator(value_spec)
+
+        def check_mapping(value):
+            _expect(value, dict)
+            for key, item in value.items():
+                try:
+                    _expect(key, key_type)
+                    check_value(item)
+                except SchemaError as e:
+                    raise e.at(key)
+        return check_mapping
+
+    if isinstance(spec, dict):
+        fields = [(name, compile_validator(field_spec)) for name, field_spec in spec.items()]
+
+        def check_record(value):
+            _expect(value, dict)
+            for name, check_field in fields:
+                if name not in value:
+                    raise SchemaError(f'missing field {name}')
+                try:
+                    check_field(value[name])
+                except SchemaError as e:
+                    raise e.at(name)
+        return check_record
+
+    raise TypeError(f'Unsupported schema spec {spec!r}')
+
+
+class Schema:
+    """
+    Current layout of a memory and how to get there from older files.
+
+    migrations maps a version to a function upgrading data of that version to the next one.
+    A version without a migration has the same layout as the next version.
+    Files written before schemas existed are version 0.
+    """
+
+    def __init__(self, version: int, spec, migrations: dict = None):
+        self.version = version
+        self.validate = compile_validator(spec)
+        self.migrations = migrations or {}
+
+    def upgrade(self, data: dict, version: int) -> dict:
+        """Migrate data of the given version to the current one and validate it"""
+        if version > self.version:
+            raise SchemaError(f'schema {version} is newer than {self.version}')
+
+        for step in range(version, self.version):
+            if step in self.migrations:
+                data = self.migrations[step](data)
+
+        self.validate(data)
+        return data